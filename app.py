@@ -11,7 +11,7 @@ from auth.authenticator import AsyncAuthenticator
 from security.rate_limiter import RateLimiter
 from security.audit_log import AuditLogger
 from security.encryption import EncryptionHandler
-from utils.data_handlers import AsyncBlogContentHandler, AsyncAnalyticsHandler
+from utils.data_handlers import AsyncBlogContentHandler, AsyncAnalyticsHandler, AsyncFileHandler
 from utils.session_manager import AsyncSessionManager
 
 # Import applications
@@ -45,6 +45,7 @@ class FairnessFactor:
         state_vars = {
             'authenticated': False,
             'user': None,
+            'session_id': None,
             'current_app': None,
             'db_session': None,
             'handlers': {},
@@ -84,6 +85,7 @@ class FairnessFactor:
             st.session_state.handlers = {
                 'auth': AsyncAuthenticator(db),
                 'blog': AsyncBlogContentHandler(db),
+                'file': AsyncFileHandler(db),
                 'analytics': AsyncAnalyticsHandler(db),
                 'rate_limiter': RateLimiter(db),
                 'audit': AuditLogger(db),
@@ -98,6 +100,18 @@ class FairnessFactor:
             logger.error(f"Failed to initialize handlers: {str(e)}")
             return False
 
+    async def close_handlers(self):
+        """Write out anything handlers still have buffered"""
+        for name, handler in st.session_state.handlers.items():
+            if hasattr(handler, 'aclose'):
+                try:
+                    await handler.aclose()
+                except Exception as e:
+                    logger.error(f"Error closing {name} handler: {str(e)}")
+
+        if st.session_state.get('db_session'):
+            await st.session_state.db_session.__aexit__(None, None, None)
+
     def render_login(self):
         """Render login page"""
         st.title("Fairness Factor Internal Tools")
@@ -148,6 +162,10 @@ class FairnessFactor:
                 {'login_time': datetime.utcnow().isoformat()}
             )
             
+            # Audit consumers compare and serialize session ids as strings
+            session_id = str(session_id) if session_id is not None else None
+            st.session_state.session_id = session_id
+            
             # Log successful login
             await st.session_state.handlers['audit'].log_event(
                 email,
@@ -209,9 +227,10 @@ class FairnessFactor:
         try:
             if st.session_state.user:
                 # End session
-                await st.session_state.handlers['session'].end_session(
-                    st.session_state.user['email']
-                )
+                if st.session_state.get('session_id'):
+                    await st.session_state.handlers['session'].end_session(
+                        st.session_state.session_id
+                    )
                 
                 # Log logout
                 await st.session_state.handlers['audit'].log_event(
@@ -270,8 +289,8 @@ class FairnessFactor:
             
         finally:
             # Cleanup if needed
-            if st.session_state.get('db_session'):
-                asyncio.run(st.session_state.db_session.__aexit__(None, None, None))
+            if st.session_state.get('handlers'):
+                asyncio.run(self.close_handlers())
 
 if __name__ == "__main__":
     app = FairnessFactor()
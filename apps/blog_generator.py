@@ -3,6 +3,7 @@ from .base_app import BaseApp
 import streamlit as st
 from typing import Dict, Any
 import logging
+import hashlib
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -81,7 +82,8 @@ class BlogGeneratorApp(BaseApp):
                         if content:
                             documents.append({
                                 'name': file.name,
-                                'content': content
+                                'content': content,
+                                'file': file
                             })
                     
                     if documents:
@@ -94,11 +96,36 @@ class BlogGeneratorApp(BaseApp):
                         
                         # Save results
                         if st.button("Save Analysis"):
-                            result = await handlers['blog'].save_research(
-                                st.session_state.user['email'],
-                                documents,
-                                analysis
-                            )
+                            # Keep the uploaded documents in GridFS; the
+                            # research record only references them
+                            document_refs = []
+                            for doc in documents:
+                                file_data = doc['file'].getvalue()
+                                file_id = await handlers['file'].save_file(
+                                    filename=doc['name'],
+                                    file_data=file_data,
+                                    metadata={
+                                        'user_email': st.session_state.user['email'],
+                                        'file_type': doc['file'].type,
+                                        'content_type': 'research_document',
+                                        'upload_date': datetime.now().isoformat()
+                                    }
+                                )
+                                if file_id is None:
+                                    break
+                                document_refs.append({
+                                    'file_id': file_id,
+                                    'filename': doc['name'],
+                                    'sha256': hashlib.sha256(file_data).hexdigest()
+                                })
+
+                            result = None
+                            if len(document_refs) == len(documents):
+                                result = await handlers['blog'].save_research(
+                                    st.session_state.user['email'],
+                                    document_refs,
+                                    analysis
+                                )
                             if result:
                                 self.show_success("Research analysis saved successfully!")
                             else:
@@ -1,6 +1,6 @@
 # auth/jwt_handler.py
 import jwt
-from datetime import datetime, timedelta
+import time
 from typing import Optional, Dict, Any
 import logging
 from config import get_settings
@@ -18,8 +18,8 @@ class JWTHandler:
     async def create_access_token(self, user: Dict[str, Any]) -> str:
         """Create JWT access token"""
         try:
-            expires_delta = timedelta(minutes=self.access_expire_minutes)
-            expire = datetime.utcnow() + expires_delta
+            # JWT exp is a NumericDate; an epoch int needs no datetime round-trip
+            expire = int(time.time()) + self.access_expire_minutes * 60
             
             payload = {
                 'user_id': str(user['_id']),
@@ -38,8 +38,7 @@ class JWTHandler:
     async def create_refresh_token(self, user: Dict[str, Any]) -> str:
         """Create JWT refresh token"""
         try:
-            expires_delta = timedelta(days=self.refresh_expire_days)
-            expire = datetime.utcnow() + expires_delta
+            expire = int(time.time()) + self.refresh_expire_days * 86400
             
             payload = {
                 'user_id': str(user['_id']),
@@ -11,6 +11,13 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "development_secret_key"
     ANTHROPIC_API_KEY: str = "default_key"
     
+    # Database settings
+    DATABASE_NAME: str = "fairness_factor_blog"
+    MAX_CONNECTIONS: int = 100
+    # Connections kept open while idle so the first requests after startup
+    # or a quiet period don't pay for a TCP/TLS handshake
+    MIN_CONNECTIONS: int = 10
+    
     # Optional settings
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
@@ -59,7 +59,7 @@ async def run_migration(db):
 
 if __name__ == "__main__":
     async def main():
-        client = AsyncIOMotorClient(settings.database.MONGODB_URI)
+        client = AsyncIOMotorClient(settings.database.MONGODB_URI, compressors='zstd,zlib')
         db = client[settings.database.DATABASE_NAME]
         
         success = await run_migration(db)
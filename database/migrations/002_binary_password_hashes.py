@@ -0,0 +1,59 @@
+# database/migrations/002_binary_password_hashes.py
+import asyncio
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+async def run_migration(db):
+    """Store password hashes that were saved as strings as BSON binary"""
+    try:
+        converted = 0
+        requests = []
+        cursor = db.users.find(
+            {'password': {'$type': 'string'}},
+            {'password': 1}
+        ).batch_size(BATCH_SIZE)
+
+        async for user in cursor:
+            # Matching on the old value leaves a concurrently changed
+            # password alone
+            requests.append(UpdateOne(
+                {'_id': user['_id'], 'password': user['password']},
+                {'$set': {'password': Binary(user['password'].encode('utf-8'), 0)}}
+            ))
+            if len(requests) >= BATCH_SIZE:
+                result = await db.users.bulk_write(requests, ordered=False)
+                converted += result.modified_count
+                requests = []
+
+        if requests:
+            result = await db.users.bulk_write(requests, ordered=False)
+            converted += result.modified_count
+
+        logger.info(f"Converted {converted} password hashes to binary")
+        return True
+
+    except Exception as e:
+        logger.error(f"Migration error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    async def main():
+        client = AsyncIOMotorClient(settings.MONGODB_URI, compressors='zstd,zlib')
+        db = client[settings.DATABASE_NAME]
+
+        success = await run_migration(db)
+        if success:
+            print("Migration completed successfully")
+        else:
+            print("Migration failed")
+
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+# database/migrations/003_backfill_analytics_rollup.py
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def run_migration(db):
+    """Rebuild the daily analytics rollup from the raw analytics events"""
+    try:
+        # Each (user, day, activity type) row is recomputed from scratch, so
+        # the migration can be re-run safely
+        pipeline = [
+            {'$group': {
+                '_id': {
+                    'user_email': '$user_email',
+                    'activity_type': '$activity_type',
+                    'day': {'$dateFromParts': {
+                        'year': {'$year': '$timestamp'},
+                        'month': {'$month': '$timestamp'},
+                        'day': {'$dayOfMonth': '$timestamp'}
+                    }}
+                },
+                'count': {'$sum': 1},
+                'last_activity': {'$max': '$timestamp'}
+            }},
+            {'$project': {
+                '_id': 0,
+                'user_email': '$_id.user_email',
+                'day': '$_id.day',
+                'activity_type': '$_id.activity_type',
+                'count': 1,
+                'last_activity': 1
+            }},
+            {'$merge': {
+                'into': 'analytics_rollup',
+                'on': ['user_email', 'day', 'activity_type'],
+                'whenMatched': 'replace',
+                'whenNotMatched': 'insert'
+            }}
+        ]
+        await db.analytics.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+        rows = await db.analytics_rollup.estimated_document_count()
+        logger.info(f"Analytics rollup backfilled: {rows} rows")
+        return True
+
+    except Exception as e:
+        logger.error(f"Migration error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    async def main():
+        client = AsyncIOMotorClient(settings.MONGODB_URI, compressors='zstd,zlib')
+        db = client[settings.DATABASE_NAME]
+
+        success = await run_migration(db)
+        if success:
+            print("Migration completed successfully")
+        else:
+            print("Migration failed")
+
+        client.close()
+
+    asyncio.run(main())
@@ -3,10 +3,50 @@ import motor.motor_asyncio
 import asyncio
 from typing import Optional, Tuple, Any
 import logging
+from pymongo import IndexModel
 from config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Sessions not used for this long are deleted by MongoDB's TTL monitor
+SESSION_TTL_SECONDS = 24 * 3600
+
+# Indexes for the sessions collection as AsyncSessionManager queries it.
+# get_active_sessions matches user_email and active and sorts on
+# last_accessed (equality, sort, range order). The TTL index expires idle
+# sessions and also serves cleanup_expired_sessions' range scan.
+SESSION_INDEXES = [
+    IndexModel(
+        [("user_email", 1), ("active", 1), ("last_accessed", -1)],
+        name="sessions_user_active_recent"
+    ),
+    IndexModel(
+        [("last_accessed", 1)],
+        expireAfterSeconds=SESSION_TTL_SECONDS,
+        name="sessions_ttl"
+    )
+]
+
+# Indexes per collection, built when the connection is initialized
+_INDEXES = {
+    'users': [
+        IndexModel([("email", 1)], unique=True),
+        IndexModel([("created_at", -1)])
+    ],
+    'sessions': [
+        IndexModel([("user_id", 1)]),
+        IndexModel([("access_token", 1)]),
+        IndexModel([("refresh_token", 1)]),
+        IndexModel([("expires_at", 1)]),
+        *SESSION_INDEXES
+    ],
+    'audit_logs': [
+        IndexModel([("user_id", 1)]),
+        IndexModel([("timestamp", -1)]),
+        IndexModel([("action", 1)])
+    ]
+}
+
 class AsyncMongoManager:
     _instance = None
 
@@ -30,7 +70,11 @@ class AsyncMongoManager:
                 self.client = motor.motor_asyncio.AsyncIOMotorClient(
                     self.uri,
                     maxPoolSize=get_settings().MAX_CONNECTIONS,
-                    minPoolSize=get_settings().MIN_CONNECTIONS
+                    minPoolSize=get_settings().MIN_CONNECTIONS,
+                    waitQueueTimeoutMS=2000,
+                    serverSelectionTimeoutMS=5000,
+                    compressors='zstd,zlib',
+                    zlibCompressionLevel=3
                 )
                 
                 # Get database
@@ -54,20 +98,12 @@ class AsyncMongoManager:
     async def _create_indexes(self):
         """Create necessary database indexes"""
         try:
-            # Users collection indexes
-            await self.db.users.create_index([("email", 1)], unique=True)
-            await self.db.users.create_index([("created_at", -1)])
-
-            # Sessions collection indexes
-            await self.db.sessions.create_index([("user_id", 1)])
-            await self.db.sessions.create_index([("access_token", 1)])
-            await self.db.sessions.create_index([("refresh_token", 1)])
-            await self.db.sessions.create_index([("expires_at", 1)])
-
-            # Audit logs collection indexes
-            await self.db.audit_logs.create_index([("user_id", 1)])
-            await self.db.audit_logs.create_index([("timestamp", -1)])
-            await self.db.audit_logs.create_index([("action", 1)])
+            # One createIndexes command per collection, and the collections
+            # are independent, so issue them concurrently
+            await asyncio.gather(*(
+                self.db[name].create_indexes(models)
+                for name, models in _INDEXES.items()
+            ))
 
             logger.info("Database indexes created successfully")
 
@@ -92,7 +128,9 @@ class AsyncDatabaseSession:
         return await self.manager.initialize()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.manager.close()
+        # The manager is a singleton whose client is shared by every
+        # session; closing it here would disconnect the others
+        pass
 
 def get_db_session() -> AsyncDatabaseSession:
     """Get database session"""
@@ -1,10 +1,16 @@
 # init_db.py
+import os
+
+# One-shot script: a single Motor worker thread is plenty
+os.environ.setdefault('MOTOR_MAX_WORKERS', '1')
+
 import asyncio
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 import bcrypt
 from config import settings
+from database.mongo_manager import SESSION_INDEXES
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,7 +19,7 @@ async def init_database():
     """Initialize database with required collections and indexes"""
     try:
         # Connect to MongoDB
-        client = AsyncIOMotorClient(settings.database.MONGODB_URI)
+        client = AsyncIOMotorClient(settings.database.MONGODB_URI, compressors='zstd,zlib')
         db = client[settings.database.DATABASE_NAME]
         
         # Create collections
@@ -22,23 +28,40 @@ async def init_database():
             'sessions',
             'blog_content',
             'analytics',
+            'analytics_rollup',
             'audit_logs',
             'rate_limits'
         ]
         
-        for collection in collections:
-            if collection not in await db.list_collection_names():
-                await db.create_collection(collection)
-                logger.info(f"Created collection: {collection}")
+        # list_collection_names already sends nameOnly; authorizedCollections
+        # additionally skips the per-namespace privilege check on the server
+        existing = set(await db.list_collection_names(authorizedCollections=True))
+        missing = [name for name in collections if name not in existing]
+        await asyncio.gather(*(db.create_collection(name) for name in missing))
+        for collection in missing:
+            logger.info(f"Created collection: {collection}")
+        
+        # Create indexes (independent of each other, so issue them together)
+        await asyncio.gather(
+            db.users.create_index([("email", 1)], unique=True),
+            db.sessions.create_indexes(SESSION_INDEXES),
+            db.blog_content.create_index([("user_email", 1)]),
+            db.analytics.create_index([("timestamp", -1)]),
+            db.analytics_rollup.create_index(
+                [("user_email", 1), ("day", 1), ("activity_type", 1)],
+                unique=True
+            ),
+            db.audit_logs.create_index([("timestamp", -1)]),
+            db.rate_limits.create_index([("timestamp", -1)])
+        )
         
-        # Create indexes
-        await db.users.create_index([("email", 1)], unique=True)
-        await db.sessions.create_index([("user_email", 1)])
-        await db.sessions.create_index([("created_at", -1)])
-        await db.blog_content.create_index([("user_email", 1)])
-        await db.analytics.create_index([("timestamp", -1)])
-        await db.audit_logs.create_index([("timestamp", -1)])
-        await db.rate_limits.create_index([("timestamp", -1)])
+        # The single-field session indexes are covered by the compound
+        # sessions_user_active_recent index
+        session_indexes = await db.sessions.index_information()
+        for name in ('user_email_1', 'created_at_-1'):
+            if name in session_indexes:
+                await db.sessions.drop_index(name)
+                logger.info(f"Dropped redundant sessions index: {name}")
         
         # Create admin user if not exists
         admin_email = settings.app.ADMIN_EMAIL
@@ -7,7 +7,7 @@ from dotenv import load_dotenv
 import logging
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
-from utils.mongo_manager import AsyncMongoManager, get_db_session, ensure_event_loop
+from utils.mongo_manager import AsyncMongoManager, get_db_session
 
 # Load environment variables
 load_dotenv()
@@ -36,7 +36,6 @@ class AsyncLLMClient:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
 
         # Initialize Anthropic client
-        ensure_event_loop()  # Ensure event loop exists
         self.client = anthropic.AsyncAnthropic(api_key=api_key)
         
         # Initialize request tracking
@@ -54,14 +53,14 @@ class AsyncLLMClient:
             str: ID of the logged request
         """
         try:
-            async with get_db_session() as (_, db, _):
-                result = await db.llm_logs.insert_one({
-                    **request_data,
-                    'timestamp': datetime.now(),
-                    'model': self.model,
-                    'temperature': self.temperature
-                })
-                return str(result.inserted_id)
+            _, db, _ = await get_db_session()
+            result = await db.llm_logs.insert_one({
+                **request_data,
+                'timestamp': datetime.now(),
+                'model': self.model,
+                'temperature': self.temperature
+            })
+            return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Failed to log LLM request: {str(e)}")
             return None
@@ -78,14 +77,14 @@ class AsyncLLMClient:
             bool: Success status of the update operation
         """
         try:
-            async with get_db_session() as (_, db, _):
-                await db.llm_logs.update_one(
-                    {'_id': log_id},
-                    {'$set': {
-                        **update_data,
-                        'updated_at': datetime.now()
-                    }}
-                )
+            _, db, _ = await get_db_session()
+            await db.llm_logs.update_one(
+                {'_id': log_id},
+                {'$set': {
+                    **update_data,
+                    'updated_at': datetime.now()
+                }}
+            )
             return True
         except Exception as e:
             logger.error(f"Failed to update log: {str(e)}")
@@ -477,7 +477,7 @@ if __name__ == "__main__":
         from utils.prompt_handler import AsyncPromptHandler
         from llm.llm_client import AsyncLLMClient
         
-        mongo_manager = AsyncMongoManager()
+        mongo_manager = await AsyncMongoManager.instance()
         client, db = await mongo_manager.get_connection()
         
         handlers = {
@@ -8,6 +8,7 @@ from llm.llm_client import AsyncLLMClient
 from utils.prompt_handler import AsyncPromptHandler
 import logging
 import io
+import hashlib
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -104,7 +105,6 @@ async def analyze_documents(
             raise ValueError("User not authenticated")
 
         # Prepare documents for analysis
-        doc_contents = [doc['content'] for doc in documents]
         doc_summary = "\n\n".join([
             f"Document: {doc['filename']}\nContent:\n{doc['content']}"
             for doc in documents
@@ -136,8 +136,7 @@ async def analyze_documents(
         
         return {
             'success': True,
-            'analysis': analysis,
-            'document_contents': doc_contents
+            'analysis': analysis
         }
     except Exception as e:
         logger.error(f"Error analyzing documents: {str(e)}")
@@ -216,9 +215,10 @@ async def topic_research_page(db_handlers, llm_client, prompt_handler):
                             processed_documents.append(processed_file)
                             
                             # Save to GridFS
+                            file_data = uploaded_file.getvalue()
                             file_id = await db_handlers['file'].save_file(
                                 filename=uploaded_file.name,
-                                file_data=uploaded_file.getvalue(),
+                                file_data=file_data,
                                 metadata={
                                     'user_email': user_email,
                                     'file_type': uploaded_file.type,
@@ -226,11 +226,15 @@ async def topic_research_page(db_handlers, llm_client, prompt_handler):
                                     'upload_date': datetime.now().isoformat()
                                 }
                             )
-                            
+                            if not file_id:
+                                st.error(f"Error saving {uploaded_file.name}")
+                                continue
+
                             file_metadata.append({
                                 'file_id': file_id,
                                 'filename': uploaded_file.name,
-                                'file_type': uploaded_file.type
+                                'file_type': uploaded_file.type,
+                                'sha256': hashlib.sha256(file_data).hexdigest()
                             })
                             
                     except Exception as e:
@@ -262,10 +266,13 @@ async def topic_research_page(db_handlers, llm_client, prompt_handler):
                             )
                             
                             if result['success']:
-                                # Save research content
+                                # Save research content; document bytes stay in GridFS
                                 content_id = await db_handlers['blog'].save_research(
                                     user_email=user_email,
-                                    document_contents=result['document_contents'],
+                                    document_refs=[
+                                        {'file_id': meta['file_id'], 'sha256': meta['sha256']}
+                                        for meta in file_metadata
+                                    ],
                                     analysis=result['analysis'],
                                     metadata={
                                         'files': file_metadata,
@@ -362,7 +369,7 @@ if __name__ == "__main__":
         from utils.prompt_handler import AsyncPromptHandler
         from llm.llm_client import AsyncLLMClient
         
-        mongo_manager = AsyncMongoManager()
+        mongo_manager = await AsyncMongoManager.instance()
         client, db = await mongo_manager.get_connection()
         
         handlers = {
@@ -130,14 +130,12 @@ async def user_management_page(db_handlers, auth_handler):
 
     # User Statistics
     st.write("### User Statistics")
-    total_users = len(users)
-    active_users = sum(1 for user in users if user.get('status') == 'active')
-    admin_users = sum(1 for user in users if user.get('role') == 'admin')
+    user_stats = await auth_handler.get_user_stats()
     
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Users", total_users)
-    col2.metric("Active Users", active_users)
-    col3.metric("Admin Users", admin_users)
+    col1.metric("Total Users", user_stats['total'])
+    col2.metric("Active Users", user_stats['active'])
+    col3.metric("Admin Users", user_stats['admin'])
 
     # Recent Activity Log
     st.write("### Recent System Activity")
@@ -181,15 +179,15 @@ if __name__ == "__main__":
     import os
     from dotenv import load_dotenv
     from utils.mongo_manager import AsyncMongoManager
-    from utils.auth import AsyncAuthHandler
+    from utils.auth import get_auth_handler
     
     load_dotenv()
     
     async def test_page():
-        mongo_manager = AsyncMongoManager()
+        mongo_manager = await AsyncMongoManager.instance()
         client, db = await mongo_manager.get_connection()
         
-        auth_handler = AsyncAuthHandler(db)
+        auth_handler = await get_auth_handler(db)
         
         handlers = {
             'analytics': None,  # Add your analytics handler here
@@ -0,0 +1,27 @@
+# tests/conftest.py
+import os
+
+# Tests issue at most a handful of concurrent operations; Motor's default
+# executor (5 x CPUs) only adds thread hand-offs. Must be set before motor
+# is imported.
+os.environ.setdefault('MOTOR_MAX_WORKERS', '1')
+
+import asyncio
+import pytest
+import pytest_asyncio
+from mongomock_motor import AsyncMongoMockClient
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop for the whole run so session-scoped async fixtures can share it"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest_asyncio.fixture(scope="session")
+async def test_db():
+    """In-memory Motor client and scratch database shared by every test"""
+    client = AsyncMongoMockClient()
+    db = client.fairness_factor_test
+    yield db
+    await client.drop_database(db.name)
@@ -1,9 +1,11 @@
 # tests/test_auth/__init__.py
+from .test_auth_handler import *
 from .test_jwt import *
 from .test_permissions import *
 from .test_two_factor import *
 
 __all__ = [
+    'test_auth_handler',
     'test_jwt',
     'test_permissions',
     'test_two_factor'
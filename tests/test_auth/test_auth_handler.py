@@ -0,0 +1,157 @@
+import time
+import pytest
+import jwt
+import bcrypt
+from unittest.mock import AsyncMock, Mock
+from utils import auth
+from utils.auth import AsyncAuthHandler
+
+@pytest.fixture
+def auth_handler(monkeypatch):
+    monkeypatch.setattr('utils.auth._JWT_SECRET_KEY', 'test_secret_key')
+    monkeypatch.setattr('utils.auth._BCRYPT_PEPPER', 'test_pepper')
+    return AsyncAuthHandler(AsyncMock())
+
+@pytest.mark.asyncio
+async def test_encode_token_is_valid_hs256(auth_handler):
+    token = auth_handler._encode_token({
+        'email': 'test@fairnessfactor.com',
+        'role': 'user',
+        'exp': int(time.time()) + 60
+    })
+
+    payload = jwt.decode(token, 'test_secret_key', algorithms=['HS256'])
+    assert payload['email'] == 'test@fairnessfactor.com'
+    assert payload['role'] == 'user'
+    assert jwt.get_unverified_header(token) == {'alg': 'HS256', 'typ': 'JWT'}
+
+@pytest.mark.asyncio
+async def test_verify_token_caches_result(auth_handler):
+    auth_handler.users_collection.find_one = AsyncMock(return_value={
+        'email': 'test@fairnessfactor.com',
+        'name': 'Test User',
+        'role': 'user',
+        'status': 'active'
+    })
+    auth._invalidate_user_caches()
+    token = auth_handler._encode_token({
+        'email': 'test@fairnessfactor.com',
+        'role': 'user',
+        'exp': int(time.time()) + 60
+    })
+
+    first = await auth_handler.verify_token(token)
+    second = await auth_handler.verify_token(token)
+
+    assert first == second == {
+        'email': 'test@fairnessfactor.com',
+        'name': 'Test User',
+        'role': 'user'
+    }
+    assert auth_handler.users_collection.find_one.await_count == 1
+
+@pytest.mark.asyncio
+async def test_verify_token_requires_exp(auth_handler):
+    auth._invalidate_user_caches()
+    token = auth_handler._encode_token({'email': 'test@fairnessfactor.com', 'role': 'user'})
+
+    assert await auth_handler.verify_token(token) is None
+
+def test_decode_hs256_matches_pyjwt():
+    token = jwt.encode(
+        {'email': 'test@fairnessfactor.com', 'exp': int(time.time()) + 60},
+        'test_secret_key',
+        algorithm='HS256'
+    )
+
+    payload = auth._decode_hs256(token, auth._hmac_prototype(b'test_secret_key'))
+    assert payload == jwt.decode(token, 'test_secret_key', algorithms=['HS256'])
+
+@pytest.mark.parametrize('claims, error', [
+    ({'email': 'test@fairnessfactor.com', 'exp': int(time.time()) - 1}, jwt.ExpiredSignatureError),
+    ({'email': 'test@fairnessfactor.com'}, jwt.MissingRequiredClaimError),
+])
+def test_decode_hs256_rejects_bad_claims(claims, error):
+    token = jwt.encode(claims, 'test_secret_key', algorithm='HS256')
+
+    with pytest.raises(error):
+        auth._decode_hs256(token, auth._hmac_prototype(b'test_secret_key'))
+
+def test_decode_hs256_rejects_bad_signature():
+    token = jwt.encode(
+        {'email': 'test@fairnessfactor.com', 'exp': int(time.time()) + 60},
+        'other_secret_key',
+        algorithm='HS256'
+    )
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        auth._decode_hs256(token, auth._hmac_prototype(b'test_secret_key'))
+
+def test_decode_hs256_rejects_other_algorithms():
+    token = jwt.encode(
+        {'email': 'test@fairnessfactor.com', 'exp': int(time.time()) + 60},
+        'test_secret_key',
+        algorithm='HS512'
+    )
+
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        auth._decode_hs256(token, auth._hmac_prototype(b'test_secret_key'))
+
+@pytest.mark.parametrize('email, allowed', [
+    ('user@fairnessfactor.com', True),
+    ('user@FairnessFactor.com', True),
+    ('USER@FAIRNESSFACTOR.COM', True),
+    ('userfairnessfactor.com', False),
+    ('user@fairnessfactor.com.evil.com', False),
+    ('user@fairnessfactor\u00e9.com', False),
+])
+def test_verify_email_domain(email, allowed):
+    assert AsyncAuthHandler.verify_email_domain(email) is allowed
+
+@pytest.mark.asyncio
+async def test_check_password_supports_all_schemes(auth_handler):
+    current = await auth._hash_password('s3cret')
+    peppered_bcrypt = bcrypt.hashpw(auth._pepper('s3cret'), bcrypt.gensalt(4))
+    legacy = bcrypt.hashpw(b's3cret', bcrypt.gensalt(4))
+
+    assert current.startswith(b'$argon2id$')
+    assert await auth._check_password('s3cret', current, auth._PASSWORD_SCHEME)
+    assert not await auth._check_password('wrong', current, auth._PASSWORD_SCHEME)
+    assert await auth._check_password('s3cret', peppered_bcrypt, auth._BCRYPT_PEPPER_SCHEME)
+    assert await auth._check_password('s3cret', legacy, None)
+    assert not auth._needs_rehash(current, auth._PASSWORD_SCHEME)
+    assert auth._needs_rehash(peppered_bcrypt, auth._BCRYPT_PEPPER_SCHEME)
+    assert auth._needs_rehash(legacy, None)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('token', [None, '', 'not-a-token', 'a.b', 'x' * 30, 'a.b.c.d' * 10, 'a.' + 'b' * 5000 + '.c'])
+async def test_verify_token_rejects_malformed_tokens(auth_handler, token):
+    auth_handler.users_collection.find_one = AsyncMock()
+
+    assert await auth_handler.verify_token(token) is None
+    auth_handler.users_collection.find_one.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_admin_count_is_cached_until_roles_change(auth_handler):
+    auth_handler.users_collection.count_documents = AsyncMock(return_value=2)
+
+    assert await auth_handler._get_admin_count() == 2
+    assert await auth_handler._get_admin_count() == 2
+    assert auth_handler.users_collection.count_documents.await_count == 1
+
+    auth_handler.users_collection.update_one = AsyncMock(return_value=Mock(modified_count=1))
+    await auth_handler.update_user('test@fairnessfactor.com', {'role': 'admin'}, 'admin@fairnessfactor.com')
+
+    assert await auth_handler._get_admin_count() == 2
+    assert auth_handler.users_collection.count_documents.await_count == 2
+
+@pytest.mark.asyncio
+async def test_rate_limit_applies_after_more_than_limit_failures(auth_handler):
+    for _ in range(auth._FAILED_LOGIN_LIMIT):
+        auth_handler._record_failed_login('test@fairnessfactor.com')
+    assert not auth_handler._is_rate_limited('test@fairnessfactor.com')
+
+    auth_handler._record_failed_login('test@fairnessfactor.com')
+    assert auth_handler._is_rate_limited('test@fairnessfactor.com')
+    assert not auth_handler._is_rate_limited('other@fairnessfactor.com')
+    assert auth_handler._failed_logins.maxsize == auth._FAILED_LOGIN_TRACKED
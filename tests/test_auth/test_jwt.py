@@ -1,11 +1,12 @@
 # tests/test_auth/test_jwt.py
+import time
 import pytest
-from datetime import datetime, timedelta
+from unittest.mock import patch
 from auth.jwt_handler import JWTHandler
 from config import settings
 
-@pytest.fixture
-async def jwt_handler(test_db):
+@pytest.fixture(scope="module")
+def jwt_handler(test_db):
     return JWTHandler(test_db)
 
 @pytest.mark.asyncio
@@ -75,19 +76,19 @@ async def test_verify_refresh_token(jwt_handler):
     assert payload['type'] == 'refresh'
 
 @pytest.mark.asyncio
-async def test_token_expiration(jwt_handler):
+async def test_token_expiration(jwt_handler, monkeypatch):
     user = {
         '_id': '123',
         'email': 'test@fairnessfactor.com',
         'role': 'user'
     }
     
-    # Create token with short expiration
-    jwt_handler.access_expire_minutes = 0
-    token = await jwt_handler.create_access_token(user)
-    
-    # Wait for expiration
-    await asyncio.sleep(1)
+    # Create token with short expiration, issued two minutes in the past
+    monkeypatch.setattr(jwt_handler, 'access_expire_minutes', 0)
+    issued_at = time.time() - 120
+    with patch('auth.jwt_handler.time') as mock_time:
+        mock_time.time.return_value = issued_at
+        token = await jwt_handler.create_access_token(user)
     
     # Verify expired token
     payload = await jwt_handler.verify_access_token(token)
@@ -2,8 +2,8 @@
 import pytest
 from auth.permissions import PermissionHandler
 
-@pytest.fixture
-async def permission_handler(test_db):
+@pytest.fixture(scope="module")
+def permission_handler(test_db):
     return PermissionHandler(test_db)
 
 @pytest.mark.asyncio
@@ -2,11 +2,11 @@ import pytest
 from unittest.mock import AsyncMock, patch
 from auth.two_factor import TwoFactorAuth
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_db():
     return AsyncMock()
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def two_factor_auth(mock_db):
     return TwoFactorAuth(mock_db)
 
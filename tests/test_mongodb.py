@@ -1,85 +1,148 @@
 # tests/test_mongodb.py
 import pytest
+import pytest_asyncio
 from unittest.mock import Mock, patch
-import os
-from datetime import datetime
 from bson import ObjectId
-from database.mongo_manager import AsyncMongoManager, get_db_session
-from utils.data_handlers import AsyncBlogContentHandler
+from mongomock_motor import AsyncMongoMockClient
+from database.mongo_manager import AsyncMongoManager
+from utils.data_handlers import AsyncBlogContentHandler, AsyncAnalyticsHandler
+from utils.batch_writer import AsyncBatchWriter
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_mongo_client():
-    with patch('motor.motor_asyncio.AsyncIOMotorClient') as mock_client:
-        mock_db = Mock()
-        mock_fs = Mock()
-        mock_client.return_value.fairness_factor_blog = mock_db
-        mock_client.return_value.admin.command = Mock()
-        yield mock_client, mock_db, mock_fs
+    return AsyncMongoMockClient()
+
+@pytest_asyncio.fixture
+async def mock_db(mock_mongo_client):
+    db = mock_mongo_client.fairness_factor_test
+    yield db
+    for name in await db.list_collection_names():
+        await db.drop_collection(name)
 
 @pytest.fixture
-def mock_db_context(mock_mongo_client):
-    mock_client, mock_db, mock_fs = mock_mongo_client
-    with patch('database.mongo_manager.AsyncMongoManager') as mock_manager:
-        mock_manager.return_value.get_connection.return_value = (mock_client, mock_db, mock_fs)
-        yield mock_db
+def mongo_manager(mock_mongo_client):
+    settings = Mock(
+        MONGODB_URI='mongodb://localhost:27017',
+        MAX_CONNECTIONS=10,
+        MIN_CONNECTIONS=1,
+        DATABASE_NAME='fairness_factor_test'
+    )
+    AsyncMongoManager._instance = None
+    with patch('database.mongo_manager.get_settings', return_value=settings), \
+         patch('motor.motor_asyncio.AsyncIOMotorClient', return_value=mock_mongo_client) as mock_client:
+        yield AsyncMongoManager(), mock_client
+    AsyncMongoManager._instance = None
 
 class TestAsyncMongoManager:
-    def test_singleton_instance(self):
+    def test_singleton_instance(self, mongo_manager):
         manager1 = AsyncMongoManager()
         manager2 = AsyncMongoManager()
         assert manager1 is manager2
 
-    def test_connection_error_handling(self, mock_mongo_client):
-        mock_client, _, _ = mock_mongo_client
+    @pytest.mark.asyncio
+    async def test_connection_error_handling(self, mongo_manager):
+        manager, mock_client = mongo_manager
         mock_client.side_effect = Exception("Connection failed")
-        
+
         with pytest.raises(Exception) as exc_info:
-            AsyncMongoManager()
+            await manager.initialize()
         assert "Connection failed" in str(exc_info.value)
 
     @pytest.mark.asyncio
-    async def test_initialize(self, mock_db_context):
-        manager = AsyncMongoManager()
+    async def test_initialize(self, mongo_manager):
+        manager, _ = mongo_manager
         client, db = await manager.initialize()
         assert client is not None
         assert db is not None
 
     @pytest.mark.asyncio
-    async def test_create_indexes(self, mock_db_context):
-        manager = AsyncMongoManager()
+    async def test_create_indexes(self, mongo_manager, mock_db):
+        manager, _ = mongo_manager
         await manager.initialize()
         await manager._create_indexes()
-        assert mock_db_context.users.create_index.called
-        assert mock_db_context.sessions.create_index.called
-        assert mock_db_context.audit_logs.create_index.called
+        assert 'email_1' in await mock_db.users.index_information()
+        assert 'user_id_1' in await mock_db.sessions.index_information()
+        assert 'timestamp_-1' in await mock_db.audit_logs.index_information()
 
 class TestAsyncBlogContentHandler:
     @pytest.fixture
-    def blog_handler(self, mock_db_context):
-        return AsyncBlogContentHandler(mock_db_context)
+    def blog_handler(self, mock_db):
+        return AsyncBlogContentHandler(mock_db)
 
     @pytest.mark.asyncio
-    async def test_save_research(self, blog_handler, mock_db_context):
-        mock_db_context.blog_content.insert_one.return_value = Mock(inserted_id=ObjectId())
-        
+    async def test_save_research(self, blog_handler, mock_db):
         result = await blog_handler.save_content(
             user_email="test@fairnessfactor.com",
             content_type="research",
             content="test content",
             metadata={"analysis": "test analysis"}
         )
-        
+
         assert isinstance(result, str)
-        assert mock_db_context.blog_content.insert_one.called
+        assert await mock_db.blog_content.find_one({'_id': ObjectId(result)}) is not None
 
     @pytest.mark.asyncio
-    async def test_get_user_content(self, blog_handler, mock_db_context):
-        expected_content = [{"_id": ObjectId(), "content": "test"}]
-        mock_db_context.blog_content.find.return_value.sort.return_value = expected_content
-        
+    async def test_save_research_stores_document_refs(self, blog_handler, mock_db):
+        document_refs = [{"file_id": str(ObjectId()), "sha256": "0" * 64}]
+
+        result = await blog_handler.save_research(
+            user_email="test@fairnessfactor.com",
+            document_refs=document_refs,
+            analysis="test analysis"
+        )
+
+        assert isinstance(result, str)
+        saved = await mock_db.blog_content.find_one({'_id': ObjectId(result)})
+        assert saved['type'] == 'research'
+        assert saved['document_refs'] == document_refs
+        assert 'document_contents' not in saved
+
+    @pytest.mark.asyncio
+    async def test_get_user_content(self, blog_handler, mock_db):
+        await mock_db.blog_content.insert_one({
+            'user_email': "test@fairnessfactor.com",
+            'type': 'research',
+            'content': 'test'
+        })
+
         result = await blog_handler.get_user_content("test@fairnessfactor.com")
-        
-        assert result == expected_content
-        assert mock_db_context.blog_content.find.called
+
+        assert len(result) == 1
+        assert result[0]['content'] == 'test'
+
+class TestAsyncBatchWriter:
+    @pytest.mark.asyncio
+    async def test_flush_writes_in_batches(self, mock_db):
+        writer = AsyncBatchWriter(mock_db.analytics, max_batch=2)
+        for i in range(5):
+            writer.enqueue({'n': i})
+
+        await writer.aclose()
+
+        assert await mock_db.analytics.count_documents({}) == 5
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_each_collection(self, mock_db):
+        writer = AsyncBatchWriter(mock_db.user_activity)
+        writer.enqueue({'n': 1})
+        writer.enqueue({'n': 2}, mock_db.login_history)
+
+        await writer.aclose()
+
+        assert await mock_db.user_activity.count_documents({}) == 1
+        assert await mock_db.login_history.count_documents({}) == 1
+
+class TestAsyncAnalyticsHandler:
+    @pytest.mark.asyncio
+    async def test_grouped_analytics_read_the_rollup(self, mock_db):
+        handler = AsyncAnalyticsHandler(mock_db)
+        for activity_type in ('login', 'login', 'draft'):
+            await handler.log_activity("test@fairnessfactor.com", activity_type, {})
+
+        result = await handler.get_user_analytics("test@fairnessfactor.com", group=True)
+
+        assert [(r['_id'], r['count']) for r in result] == [('login', 2), ('draft', 1)]
+        assert await mock_db.analytics_rollup.count_documents({}) == 2
+        await handler.aclose()
 
 # Add more test classes and methods as needed
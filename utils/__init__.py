@@ -1,16 +1,19 @@
 # utils/__init__.py
-from .auth import AsyncAuthHandler
+from .auth import AsyncAuthHandler, get_auth_handler
 from .mongo_manager import AsyncMongoManager
 from .data_handlers import AsyncBlogContentHandler, AsyncFileHandler, AsyncAnalyticsHandler
 from .prompt_handler import AsyncPromptHandler
 from .session_manager import AsyncSessionManager
+from .batch_writer import AsyncBatchWriter
 
 __all__ = [
     'AsyncAuthHandler',
+    'get_auth_handler',
     'AsyncMongoManager',
     'AsyncBlogContentHandler',
     'AsyncFileHandler',
     'AsyncAnalyticsHandler',
     'AsyncPromptHandler',
-    'AsyncSessionManager'
+    'AsyncSessionManager',
+    'AsyncBatchWriter'
 ]
\ No newline at end of file
@@ -0,0 +1,936 @@
+# utils/auth.py
+import os
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import secrets
+import time
+from collections import deque
+from datetime import datetime
+import logging
+import jwt
+import bcrypt
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from bson import Binary
+from cachetools import TTLCache
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from utils.batch_writer import AsyncBatchWriter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Environment is read once at import rather than on every handler/call
+_JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+_ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@fairnessfactor.com').lower()
+_ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
+_BCRYPT_PEPPER = os.getenv('BCRYPT_PEPPER')
+
+# Password hashing is pure CPU work; keep it off the event loop and out of
+# the default executor that Motor and other blocking calls share
+_crypto_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix='auth-crypto')
+
+# Bound how many hashes may be queued at once so a login burst waits here
+# instead of piling unbounded work onto the pool. The semaphore is made per
+# event loop: before Python 3.10 it binds to the loop current when it is
+# created, and every Streamlit rerun runs under a new loop.
+_CRYPTO_CONCURRENCY = 2 * (os.cpu_count() or 1)
+_crypto_sem: Optional[asyncio.Semaphore] = None
+_crypto_sem_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_crypto_sem() -> asyncio.Semaphore:
+    """The hashing semaphore for the running event loop"""
+    global _crypto_sem, _crypto_sem_loop
+    loop = asyncio.get_running_loop()
+    if _crypto_sem is None or _crypto_sem_loop is not loop:
+        _crypto_sem = asyncio.Semaphore(_CRYPTO_CONCURRENCY)
+        _crypto_sem_loop = loop
+    return _crypto_sem
+
+async def _run_crypto(func, *args):
+    """Run a password-hashing call on the dedicated pool under back-pressure"""
+    async with _get_crypto_sem():
+        return await asyncio.get_running_loop().run_in_executor(_crypto_pool, func, *args)
+
+# Projections for the user lookups on hot paths, so only the fields each
+# one reads cross the wire
+_LOGIN_FIELDS = {
+    '_id': 0, 'email': 1, 'name': 1, 'role': 1, 'status': 1, 'password': 1,
+    'password_scheme': 1, 'failed_login_attempts': 1, 'last_failed_login': 1
+}
+_TOKEN_USER_FIELDS = {'_id': 0, 'email': 1, 'name': 1, 'role': 1, 'status': 1}
+_PROFILE_FIELDS = {'_id': 0, 'email': 1, 'name': 1, 'role': 1, 'status': 1, 'created_at': 1}
+# Name the fields the user lists show rather than excluding secrets, so
+# new fields (hashes, schemes, counters) never leak into listings
+_USER_LIST_FIELDS = {
+    '_id': 0, 'email': 1, 'name': 1, 'role': 1, 'status': 1,
+    'created_at': 1, 'created_by': 1, 'last_login': 1
+}
+
+# List reads are capped, and fetched in batches of this size so a long
+# history costs few getMore round trips
+_MAX_LISTED_USERS = 1000
+_CURSOR_BATCH_SIZE = 256
+
+# Only Fairness Factor addresses may hold accounts. The common spellings
+# are matched as-is so most checks avoid lowercasing the whole address.
+_EMAIL_DOMAIN = '@fairnessfactor.com'
+_EMAIL_DOMAIN_FAST = (_EMAIL_DOMAIN, '@FairnessFactor.com')
+
+# BSON dates only keep milliseconds, so the auth paths reuse one UTC
+# datetime per millisecond instead of building a new one for every field
+_clock_ms = -1
+_clock_dt: Optional[datetime] = None
+
+def _now() -> datetime:
+    """UTC time truncated to the millisecond, cached within that millisecond"""
+    global _clock_ms, _clock_dt
+    ms = time.time_ns() // 1_000_000
+    if ms != _clock_ms:
+        _clock_ms = ms
+        _clock_dt = datetime.utcfromtimestamp(ms / 1000)
+    return _clock_dt
+
+# Stored lockout: this many consecutive failures lock the account
+_LOCKOUT_ATTEMPTS = 5
+_LOCKOUT_SECONDS = 1800
+
+# Once an email has more than this many failed attempts within the window,
+# login stops spending bcrypt time on it. At most _FAILED_LOGIN_TRACKED
+# emails are tracked, so sprayed addresses cannot grow memory without bound.
+_FAILED_LOGIN_LIMIT = 10
+_FAILED_LOGIN_WINDOW_SECONDS = 60
+_FAILED_LOGIN_TRACKED = 10_000
+
+# Issued tokens are valid for one day
+_TOKEN_TTL_SECONDS = 86400
+
+def _b64url(data: bytes) -> bytes:
+    """Unpadded base64url encoding as used by JWS"""
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def _b64url_decode(data: bytes) -> bytes:
+    """Decode unpadded base64url"""
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+# Every token we issue carries the same JOSE header
+_JWT_HEADER_B64 = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+def _hmac_prototype(key: bytes) -> hmac.HMAC:
+    """HMAC-SHA256 with the key schedule done once; copy it for each use"""
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+def _sign(prototype: hmac.HMAC, signing_input: bytes) -> bytes:
+    """HS256 signature of signing_input using a keyed prototype"""
+    mac = prototype.copy()
+    mac.update(signing_input)
+    return mac.digest()
+
+def _decode_hs256(token: str, prototype: hmac.HMAC) -> Dict[str, Any]:
+    """Verify an HS256 JWT and return its claims.
+
+    Raises the same PyJWT exceptions as jwt.decode with exp required.
+    """
+    try:
+        signing_input, _, signature = token.encode('ascii').rpartition(b'.')
+        header_b64, _, payload_b64 = signing_input.partition(b'.')
+        if not header_b64 or not payload_b64:
+            raise jwt.DecodeError("Not enough segments")
+
+        # Our own tokens match the cached header byte for byte
+        if header_b64 != _JWT_HEADER_B64:
+            header = orjson.loads(_b64url_decode(header_b64))
+            if not isinstance(header, dict) or header.get('alg') != 'HS256':
+                raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+
+        expected = _sign(prototype, signing_input)
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except (UnicodeEncodeError, binascii.Error, orjson.JSONDecodeError) as e:
+        raise jwt.DecodeError(f"Invalid token: {str(e)}")
+
+    if not isinstance(payload, dict):
+        raise jwt.DecodeError("Invalid payload")
+    exp = payload.get('exp')
+    if exp is None:
+        raise jwt.MissingRequiredClaimError('exp')
+    if not isinstance(exp, (int, float)):
+        raise jwt.DecodeError("Expiration Time claim (exp) must be an integer.")
+    if exp <= time.time():
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    return payload
+
+# Verifiers for credentials that passed bcrypt recently, keyed by email.
+# The MAC covers the stored hash, so a password change invalidates them.
+_VERIFIER_KEY = secrets.token_bytes(32)
+_verified_logins = TTLCache(maxsize=10_000, ttl=60)
+
+def _login_verifier(stored_password: bytes, password: bytes) -> bytes:
+    """Keyed digest binding a candidate password to the stored hash"""
+    return hmac.new(_VERIFIER_KEY, stored_password + b'\x00' + password, hashlib.sha256).digest()
+
+# Recently verified tokens: blake2b-128(token) -> (expires_at, user info).
+# Entries never outlive the token's own exp; user changes clear the cache.
+_TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache = TTLCache(maxsize=10_000, ttl=_TOKEN_CACHE_TTL_SECONDS)
+
+def _token_cache_key(token: str) -> bytes:
+    """Cache key for a token that never retains the token itself"""
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+# Active users' token claims by email, so a fresh token for a user seen in
+# the last few seconds skips the Mongo lookup too
+_user_cache = TTLCache(maxsize=10_000, ttl=_TOKEN_CACHE_TTL_SECONDS)
+
+def _invalidate_user_caches():
+    """Forget cached token and user lookups after a user is changed"""
+    _token_cache.clear()
+    _user_cache.clear()
+
+# How long the last-admin guards trust a counted number of admins
+_ADMIN_COUNT_TTL_SECONDS = 30
+
+# Passwords are HMAC'd with a server-side pepper and then hashed with
+# argon2id. The pepper never touches the database, so an attacker holding
+# the hashes still has to guess it. Older documents carry a peppered bcrypt
+# hash or, with no password_scheme at all, a plain bcrypt hash; both are
+# upgraded on the next successful login.
+_PASSWORD_SCHEME = 'argon2id-hmac-sha256'
+_BCRYPT_PEPPER_SCHEME = 'bcrypt-hmac-sha256'
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+
+def _pepper(password: str) -> bytes:
+    """Peppered password digest; base64 keeps it NUL-free and under bcrypt's 72-byte limit"""
+    digest = hmac.new(_BCRYPT_PEPPER.encode('utf-8'), password.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(digest)
+
+def _hash_password_sync(password: str) -> bytes:
+    """Hash a password under the current scheme"""
+    return _password_hasher.hash(_pepper(password)).encode('ascii')
+
+def _verify_password_sync(password: str, stored_password: bytes, scheme: Optional[str]) -> bool:
+    """Check a password against a hash stored under any supported scheme"""
+    if scheme == _PASSWORD_SCHEME:
+        try:
+            return _password_hasher.verify(stored_password, _pepper(password))
+        except (VerificationError, InvalidHashError):
+            return False
+    if scheme == _BCRYPT_PEPPER_SCHEME:
+        return bcrypt.checkpw(_pepper(password), stored_password)
+    return bcrypt.checkpw(password.encode('utf-8'), stored_password)
+
+def _needs_rehash(stored_password: bytes, scheme: Optional[str]) -> bool:
+    """Whether a verified hash should be replaced with a current one"""
+    if scheme != _PASSWORD_SCHEME:
+        return True
+    return _password_hasher.check_needs_rehash(stored_password.decode('ascii'))
+
+async def _hash_password(password: str) -> bytes:
+    """Hash a password on the crypto pool, ready to store as BSON binary"""
+    return Binary(await _run_crypto(_hash_password_sync, password), 0)
+
+async def _check_password(password: str, stored_password: bytes, scheme: Optional[str]) -> bool:
+    """Check a password on the crypto pool"""
+    return await _run_crypto(_verify_password_sync, password, stored_password, scheme)
+
+# Hash checked against when the user does not exist, so unknown emails take
+# as long as wrong passwords and cannot be enumerated by timing
+_dummy_password_hash: Optional[bytes] = None
+
+async def _get_dummy_password_hash() -> bytes:
+    """Hash a throwaway password once, at the same cost as real hashes"""
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = await _hash_password(secrets.token_hex(16))
+    return _dummy_password_hash
+
+# Hash of ADMIN_PASSWORD, computed at most once per process
+_admin_password_hash: Optional[bytes] = None
+
+async def _get_admin_password_hash(admin_password: str) -> bytes:
+    """Hash the bootstrap admin password once and reuse it"""
+    global _admin_password_hash
+    if _admin_password_hash is None:
+        _admin_password_hash = await _hash_password(admin_password)
+    return _admin_password_hash
+
+class AsyncAuthHandler:
+    """Handles user authentication and management"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.secret_key = _JWT_SECRET_KEY
+        if not self.secret_key:
+            raise ValueError("JWT_SECRET_KEY not found in environment variables")
+        if not _BCRYPT_PEPPER:
+            raise ValueError("BCRYPT_PEPPER not found in environment variables")
+        self._hmac_proto = _hmac_prototype(self.secret_key.encode('utf-8'))
+        self.db = db
+        self.users_collection = db.users
+        self.login_history_collection = db.login_history
+        # Login history and user activity are append-only audit trails;
+        # one writer batches both off the request path
+        self._audit_writer = AsyncBatchWriter(db.user_activity)
+        # Monotonic timestamps of recent failed logins, per lowercased email
+        self._failed_logins = TTLCache(
+            maxsize=_FAILED_LOGIN_TRACKED,
+            ttl=_FAILED_LOGIN_WINDOW_SECONDS
+        )
+        # Admin count for the last-admin guards; changes rarely
+        self._admin_count_cache = TTLCache(maxsize=1, ttl=_ADMIN_COUNT_TTL_SECONDS)
+        self._started = False
+        self._startup_lock = asyncio.Lock()
+
+    async def startup(self):
+        """Create indexes, then the admin user, once per handler"""
+        if self._started:
+            return
+        async with self._startup_lock:
+            if self._started:
+                return
+            await self._ensure_indexes()
+            await self._ensure_admin_user()
+            self._started = True
+
+    async def _ensure_indexes(self):
+        """Create necessary database indexes"""
+        try:
+            # One createIndexes command per collection, all three concurrently
+            await asyncio.gather(
+                self.users_collection.create_indexes([
+                    # The unique email index also enforces "User already exists"
+                    IndexModel([("email", 1)], unique=True),
+                    IndexModel([("created_at", -1)]),
+                    IndexModel([("role", 1)]),
+                    # Holds every field verify_token projects, so token checks
+                    # are answered from the index without fetching the document
+                    IndexModel(
+                        [("email", 1), ("status", 1), ("role", 1), ("name", 1)],
+                        name='email_status_role_name'
+                    )
+                ]),
+                # Per-user history is read newest first; one compound index
+                # serves both the filter and the sort
+                self.login_history_collection.create_indexes([
+                    IndexModel([("user_email", 1), ("timestamp", -1)]),
+                    IndexModel([("timestamp", -1)])
+                ]),
+                self.db.user_activity.create_indexes([
+                    IndexModel([("user_email", 1), ("timestamp", -1)])
+                ])
+            )
+            logger.info("Auth indexes created successfully")
+        except Exception as e:
+            logger.error(f"Error creating auth indexes: {str(e)}")
+
+    async def _ensure_admin_user(self):
+        """Ensure admin user exists"""
+        try:
+            admin_email = _ADMIN_EMAIL
+            admin_password = _ADMIN_PASSWORD
+            if not admin_password:
+                logger.warning("ADMIN_PASSWORD not set; skipping admin user bootstrap")
+                return
+
+            admin_exists = await self.users_collection.find_one(
+                {'email': admin_email},
+                projection={'_id': 1}
+            )
+            if not admin_exists:
+                hashed_password = await _get_admin_password_hash(admin_password)
+
+                await self.users_collection.insert_one({
+                    'email': admin_email,
+                    'password': hashed_password,
+                    'password_scheme': _PASSWORD_SCHEME,
+                    'name': 'Admin User',
+                    'role': 'admin',
+                    'created_at': _now(),
+                    'created_by': 'system',
+                    'last_login': None,
+                    'status': 'active'
+                })
+                self._admin_count_cache.clear()
+                logger.info("Created default admin user")
+        except Exception as e:
+            logger.error(f"Error ensuring admin user: {str(e)}")
+
+    def _encode_token(self, payload: Dict[str, Any]) -> str:
+        """Encode an HS256 JWT using the cached header and signing key"""
+        signing_input = _JWT_HEADER_B64 + b'.' + _b64url(orjson.dumps(payload))
+        signature = _sign(self._hmac_proto, signing_input)
+        return (signing_input + b'.' + _b64url(signature)).decode('ascii')
+
+    @staticmethod
+    def verify_email_domain(email: str) -> bool:
+        """Verify email belongs to Fairness Factor domain."""
+        return email.endswith(_EMAIL_DOMAIN_FAST) or email.lower().endswith(_EMAIL_DOMAIN)
+
+    async def add_user(
+        self,
+        email: str,
+        password: str,
+        name: str,
+        added_by: str,
+        role: str = 'user'
+    ) -> bool:
+        """Add a new user to the system."""
+        try:
+            if not self.verify_email_domain(email):
+                raise ValueError("Only Fairness Factor email addresses are allowed")
+
+            email_l = email.lower()
+            now = _now()
+
+            hashed = await _hash_password(password)
+
+            try:
+                await self.users_collection.insert_one({
+                    'email': email_l,
+                    'password': hashed,
+                    'password_scheme': _PASSWORD_SCHEME,
+                    'name': name,
+                    'role': role,
+                    'created_at': now,
+                    'created_by': added_by,
+                    'last_login': None,
+                    'status': 'active',
+                    'failed_login_attempts': 0,
+                    'last_password_change': now
+                })
+            except DuplicateKeyError:
+                raise ValueError("User already exists")
+
+            if role == 'admin':
+                self._admin_count_cache.clear()
+
+            # Log user creation
+            self._audit_writer.enqueue({
+                'user_email': email_l,
+                'activity_type': 'user_created',
+                'created_by': added_by,
+                'timestamp': now
+            })
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Error adding user {email}: {str(e)}")
+            raise
+
+    async def login(self, email: str, password: str) -> Optional[str]:
+        """Authenticate user and return JWT token."""
+        try:
+            email_l = email.lower()
+            if self._is_rate_limited(email_l):
+                await self._log_failed_login(email_l, 'rate_limited')
+                return None
+
+            user = await self.users_collection.find_one(
+                {'email': email_l},
+                projection=_LOGIN_FIELDS
+            )
+            if not user:
+                await _check_password(password, await _get_dummy_password_hash(), _PASSWORD_SCHEME)
+                self._record_failed_login(email_l)
+                await self._log_failed_login(email_l, 'user_not_found')
+                return None
+
+            if user.get('status') != 'active':
+                await self._log_failed_login(email_l, 'account_inactive')
+                return None
+
+            now = _now()
+
+            # Check failed login attempts
+            if user.get('failed_login_attempts', 0) >= _LOCKOUT_ATTEMPTS:
+                last_attempt = user.get('last_failed_login')
+                if last_attempt and (now - last_attempt).total_seconds() < _LOCKOUT_SECONDS:
+                    await self._log_failed_login(email_l, 'account_locked')
+                    return None
+
+            stored_password = user['password']
+
+            # Skip bcrypt if the same credentials were verified moments ago
+            password_bytes = password.encode('utf-8')
+            verifier = _login_verifier(stored_password, password_bytes)
+            cached_verifier = _verified_logins.get(user['email'])
+            if cached_verifier is not None and hmac.compare_digest(cached_verifier, verifier):
+                is_valid = True
+            else:
+                is_valid = await _check_password(password, stored_password, user.get('password_scheme'))
+                if is_valid:
+                    _verified_logins[user['email']] = verifier
+
+            if is_valid:
+                self._failed_logins.pop(email_l, None)
+
+                # Reset failed login attempts
+                login_updates = {
+                    'failed_login_attempts': 0,
+                    'last_login': now
+                }
+
+                # Move older hashes to the current scheme and parameters
+                if _needs_rehash(stored_password, user.get('password_scheme')):
+                    new_hash = await _hash_password(password)
+                    login_updates['password'] = new_hash
+                    login_updates['password_scheme'] = _PASSWORD_SCHEME
+                    _verified_logins[user['email']] = _login_verifier(new_hash, password_bytes)
+
+                await self.users_collection.update_one(
+                    {'email': email_l},
+                    {'$set': login_updates}
+                )
+
+                # Generate token
+                token = self._encode_token({
+                    'email': user['email'],
+                    'name': user['name'],
+                    'role': user.get('role', 'user'),
+                    'exp': int(time.time()) + _TOKEN_TTL_SECONDS
+                })
+
+                # Log successful login without holding up the token
+                self._write_login_history({
+                    'user_email': user['email'],
+                    'timestamp': now,
+                    'success': True,
+                    'ip_address': None,  # Could be added if needed
+                    'user_agent': None   # Could be added if needed
+                })
+
+                return token
+
+            # Handle failed login
+            self._record_failed_login(email_l)
+            await self._handle_failed_login(email_l)
+            return None
+
+        except Exception as e:
+            logger.error(f"Login error for {email}: {str(e)}")
+            return None
+
+    def _recent_failed_logins(self, email_l: str) -> deque:
+        """Failed login times for email_l still inside the window"""
+        attempts = self._failed_logins.get(email_l)
+        if attempts is None:
+            return deque()
+        cutoff = time.monotonic() - _FAILED_LOGIN_WINDOW_SECONDS
+        while attempts and attempts[0] < cutoff:
+            attempts.popleft()
+        return attempts
+
+    def _record_failed_login(self, email_l: str) -> None:
+        """Note a failed login; re-storing the entry restarts its TTL"""
+        attempts = self._recent_failed_logins(email_l)
+        attempts.append(time.monotonic())
+        self._failed_logins[email_l] = attempts
+
+    def _is_rate_limited(self, email_l: str) -> bool:
+        """Whether email_l has too many recent failed logins in this process"""
+        return len(self._recent_failed_logins(email_l)) > _FAILED_LOGIN_LIMIT
+
+    async def _handle_failed_login(self, email: str):
+        """Handle failed login attempt"""
+        try:
+            email_l = email.lower()
+            now = _now()
+            # Get the new count back with the increment instead of re-reading
+            user = await self.users_collection.find_one_and_update(
+                {'email': email_l},
+                {
+                    '$inc': {'failed_login_attempts': 1},
+                    '$set': {'last_failed_login': now}
+                },
+                projection={'_id': 0, 'failed_login_attempts': 1},
+                return_document=ReturnDocument.AFTER
+            )
+            await self._log_failed_login(email, 'invalid_password')
+
+            if user and user.get('failed_login_attempts') == _LOCKOUT_ATTEMPTS:
+                logger.warning(f"Account {email} locked after {_LOCKOUT_ATTEMPTS} failed login attempts")
+                self._audit_writer.enqueue({
+                    'user_email': email_l,
+                    'activity_type': 'account_locked',
+                    'timestamp': now
+                })
+        except Exception as e:
+            logger.error(f"Error handling failed login: {str(e)}")
+
+    async def _log_failed_login(self, email: str, reason: str):
+        """Log failed login attempt"""
+        self._write_login_history({
+            'user_email': email,
+            'timestamp': _now(),
+            'success': False,
+            'reason': reason
+        })
+
+    def _write_login_history(self, entry: Dict[str, Any]):
+        """Buffer a login-history entry for the next batched insert"""
+        self._audit_writer.enqueue(entry, self.login_history_collection)
+
+    async def drain_pending_writes(self):
+        """Write out any buffered login history and activity, e.g. on shutdown"""
+        await self._audit_writer.flush()
+
+    async def aclose(self):
+        """Stop background work and flush buffered writes before shutdown"""
+        await self._audit_writer.aclose()
+        for key, handler in list(_auth_handlers.items()):
+            if handler is self:
+                del _auth_handlers[key]
+
+    async def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verify JWT token and return user info."""
+        # Reject obvious junk before hashing, caching or HMAC
+        if not isinstance(token, str) or not 20 < len(token) < 4096 or token.count('.') != 2:
+            return None
+
+        try:
+            cache_key = _token_cache_key(token)
+            cached = _token_cache.get(cache_key)
+            if cached is not None:
+                expires_at, user_info = cached
+                if expires_at > time.time():
+                    return dict(user_info)
+                del _token_cache[cache_key]
+
+            # HS256 verification is a few microseconds of HMAC; an executor
+            # hop would cost more than the work itself
+            payload = _decode_hs256(token, self._hmac_proto)
+
+            user_info = _user_cache.get(payload['email'])
+            if user_info is None:
+                user = await self.users_collection.find_one(
+                    {'email': payload['email']},
+                    projection=_TOKEN_USER_FIELDS
+                )
+                if user and user.get('status') == 'active':
+                    user_info = _user_cache[payload['email']] = {
+                        'email': user['email'],
+                        'name': user['name'],
+                        'role': user.get('role', 'user')
+                    }
+
+            if user_info is not None:
+                expires_at = min(payload['exp'], time.time() + _TOKEN_CACHE_TTL_SECONDS)
+                _token_cache[cache_key] = (expires_at, user_info)
+                return dict(user_info)
+            return None
+
+        except jwt.ExpiredSignatureError:
+            logger.warning("Token expired")
+            return None
+        except jwt.InvalidTokenError:
+            logger.warning("Invalid token")
+            return None
+        except Exception as e:
+            logger.error(f"Token verification error: {str(e)}")
+            return None
+
+    async def get_user(self, email: str) -> Optional[Dict[str, Any]]:
+        """Get user information."""
+        try:
+            user = await self.users_collection.find_one(
+                {'email': email.lower()},
+                projection=_PROFILE_FIELDS
+            )
+            if user:
+                return {
+                    'email': user['email'],
+                    'name': user['name'],
+                    'role': user.get('role', 'user'),
+                    'status': user.get('status', 'active'),
+                    'created_at': user['created_at']
+                }
+            return None
+        except Exception as e:
+            logger.error(f"Error retrieving user {email}: {str(e)}")
+            return None
+
+    async def get_all_users(self, limit: int = _MAX_LISTED_USERS) -> List[Dict[str, Any]]:
+        """Get all users, newest first"""
+        try:
+            cursor = self.users_collection.find(
+                {},
+                _USER_LIST_FIELDS
+            ).sort('created_at', -1).limit(limit).batch_size(_CURSOR_BATCH_SIZE)
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error getting users: {str(e)}")
+            return []
+
+    async def get_user_stats(self) -> Dict[str, int]:
+        """Get total, active and admin user counts in a single aggregation"""
+        try:
+            cursor = self.users_collection.aggregate([
+                {'$facet': {
+                    'total': [{'$count': 'n'}],
+                    'active': [{'$match': {'status': 'active'}}, {'$count': 'n'}],
+                    'admin': [{'$match': {'role': 'admin'}}, {'$count': 'n'}]
+                }}
+            ])
+            result = await cursor.to_list(length=1)
+            facets = result[0] if result else {}
+            return {
+                key: facets[key][0]['n'] if facets.get(key) else 0
+                for key in ('total', 'active', 'admin')
+            }
+        except Exception as e:
+            logger.error(f"Error getting user statistics: {str(e)}")
+            return {'total': 0, 'active': 0, 'admin': 0}
+
+    async def _get_admin_count(self) -> int:
+        """Number of admin users, cached briefly"""
+        admin_count = self._admin_count_cache.get('admin')
+        if admin_count is None:
+            admin_count = await self.users_collection.count_documents({'role': 'admin'})
+            self._admin_count_cache['admin'] = admin_count
+        return admin_count
+
+    async def delete_user(self, email: str, admin_email: str) -> bool:
+        """Delete a user"""
+        try:
+            email_l = email.lower()
+            # Don't allow deletion of the last admin user
+            if email_l == _ADMIN_EMAIL:
+                admin_count = await self._get_admin_count()
+                if admin_count <= 1:
+                    raise ValueError("Cannot delete the last admin user")
+
+            result = await self.users_collection.delete_one({'email': email_l})
+
+            if result.deleted_count > 0:
+                _invalidate_user_caches()
+                self._admin_count_cache.clear()
+                # Log user deletion
+                self._audit_writer.enqueue({
+                    'user_email': email_l,
+                    'activity_type': 'user_deleted',
+                    'deleted_by': admin_email,
+                    'timestamp': _now()
+                })
+                return True
+            return False
+
+        except Exception as e:
+            logger.error(f"Error deleting user {email}: {str(e)}")
+            return False
+
+    async def update_user(
+        self,
+        email: str,
+        updates: Dict[str, Any],
+        admin_email: str
+    ) -> bool:
+        """Update user information"""
+        try:
+            email_l = email.lower()
+            # Don't allow role change for the last admin
+            if 'role' in updates and email_l == _ADMIN_EMAIL:
+                admin_count = await self._get_admin_count()
+                if admin_count <= 1 and updates['role'] != 'admin':
+                    raise ValueError("Cannot change role of the last admin user")
+
+            now = _now()
+            # The caller's dict becomes the $set document, as in update_content
+            updates['updated_at'] = now
+            result = await self.users_collection.update_one(
+                {'email': email_l},
+                {'$set': updates}
+            )
+
+            if result.modified_count > 0:
+                _invalidate_user_caches()
+                if 'role' in updates:
+                    self._admin_count_cache.clear()
+                # Log user update
+                self._audit_writer.enqueue({
+                    'user_email': email_l,
+                    'activity_type': 'user_updated',
+                    'updated_by': admin_email,
+                    'updates': updates,
+                    'timestamp': now
+                })
+                return True
+            return False
+
+        except Exception as e:
+            logger.error(f"Error updating user {email}: {str(e)}")
+            return False
+
+    async def bulk_update_users(
+        self,
+        updates_by_email: Dict[str, Dict[str, Any]],
+        admin_email: str
+    ) -> int:
+        """Update several users in one round trip; returns the number modified"""
+        try:
+            if not updates_by_email:
+                return 0
+
+            updates_by_email = {
+                email.lower(): updates for email, updates in updates_by_email.items()
+            }
+            admin_updates = updates_by_email.get(_ADMIN_EMAIL)
+            if admin_updates and admin_updates.get('role', 'admin') != 'admin':
+                admin_count = await self._get_admin_count()
+                if admin_count <= 1:
+                    raise ValueError("Cannot change role of the last admin user")
+
+            now = _now()
+            requests = []
+            for email_l, updates in updates_by_email.items():
+                updates['updated_at'] = now
+                requests.append(UpdateOne({'email': email_l}, {'$set': updates}))
+
+            result = await self.users_collection.bulk_write(requests, ordered=False)
+
+            if result.modified_count > 0:
+                _invalidate_user_caches()
+                if any('role' in updates for updates in updates_by_email.values()):
+                    self._admin_count_cache.clear()
+                for email_l, updates in updates_by_email.items():
+                    self._audit_writer.enqueue({
+                        'user_email': email_l,
+                        'activity_type': 'user_updated',
+                        'updated_by': admin_email,
+                        'updates': updates,
+                        'timestamp': now
+                    })
+            return result.modified_count
+
+        except Exception as e:
+            logger.error(f"Error bulk updating users: {str(e)}")
+            return 0
+
+    async def change_password(
+        self,
+        email: str,
+        current_password: str,
+        new_password: str
+    ) -> bool:
+        """Change user password"""
+        try:
+            email_l = email.lower()
+            user = await self.users_collection.find_one(
+                {'email': email_l},
+                projection={'_id': 0, 'password': 1, 'password_scheme': 1}
+            )
+            if not user:
+                return False
+
+            stored_password = user['password']
+
+            # Verify current password
+            is_valid = await _check_password(
+                current_password,
+                stored_password,
+                user.get('password_scheme')
+            )
+
+            if not is_valid:
+                return False
+
+            now = _now()
+
+            # Hash new password
+            new_hash = await _hash_password(new_password)
+
+            # Update password only if it is still the one we verified, so a
+            # concurrent change is not silently overwritten
+            result = await self.users_collection.find_one_and_update(
+                {'email': email_l, 'password': user['password']},
+                {
+                    '$set': {
+                        'password': new_hash,
+                        'password_scheme': _PASSWORD_SCHEME,
+                        'last_password_change': now
+                    }
+                },
+                projection={'_id': 1},
+                return_document=ReturnDocument.AFTER
+            )
+
+            if result is not None:
+                # Log password change
+                self._audit_writer.enqueue({
+                    'user_email': email_l,
+                    'activity_type': 'password_changed',
+                    'timestamp': now
+                })
+                return True
+            return False
+
+        except Exception as e:
+            logger.error(f"Error changing password for {email}: {str(e)}")
+            return False
+
+    async def get_user_activity(
+        self,
+        email: str,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get user activity history"""
+        try:
+            await self._audit_writer.flush()
+            cursor = self.db.user_activity.find(
+                {'user_email': email.lower()}
+            ).sort('timestamp', -1).limit(limit).batch_size(_CURSOR_BATCH_SIZE)
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error retrieving user activity: {str(e)}")
+            return []
+
+    async def get_login_history(
+        self,
+        email: str,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Get user login history"""
+        try:
+            await self._audit_writer.flush()
+            cursor = self.login_history_collection.find(
+                {'user_email': email.lower()}
+            ).sort('timestamp', -1).limit(limit).batch_size(_CURSOR_BATCH_SIZE)
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error retrieving login history: {str(e)}")
+            return []
+
+# One handler per database, so bootstrap work and the history buffer are
+# shared instead of repeated for every caller. Handlers hold locks and
+# tasks bound to the loop they were made on, and Streamlit runs every
+# rerun under a fresh asyncio.run, so the registry only serves one loop.
+_auth_handlers: Dict[str, AsyncAuthHandler] = {}
+_auth_handlers_loop: Optional[asyncio.AbstractEventLoop] = None
+
+async def get_auth_handler(db: AsyncIOMotorDatabase) -> AsyncAuthHandler:
+    """Return the shared auth handler for a database, started on first use"""
+    global _auth_handlers_loop
+    loop = asyncio.get_running_loop()
+    if _auth_handlers_loop is not loop:
+        # Handlers from an earlier run flushed their buffers when that run
+        # cancelled their tasks; they cannot be used from this loop
+        _auth_handlers.clear()
+        _auth_handlers_loop = loop
+    handler = _auth_handlers.get(db.name)
+    if handler is None or handler.db.client is not db.client:
+        stale = handler
+        handler = _auth_handlers[db.name] = AsyncAuthHandler(db)
+        if stale is not None:
+            await stale.aclose()
+    await handler.startup()
+    return handler
@@ -0,0 +1,74 @@
+# utils/batch_writer.py
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class AsyncBatchWriter:
+    """Coalesces fire-and-forget telemetry inserts into periodic insert_many calls.
+
+    Documents are queued per target collection; `collection` is the default
+    target and others can be passed to `enqueue`. A flush drains every
+    queue concurrently.
+    """
+
+    def __init__(self, collection, max_batch: int = 500, flush_interval: float = 0.2):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        # collection name -> (collection, queued documents)
+        self._queues: Dict[str, tuple] = {}
+        self._flush_task = None
+
+    def enqueue(self, document: Dict[str, Any], collection=None) -> None:
+        """Buffer a document for the next batched insert"""
+        collection = collection if collection is not None else self.collection
+        queue = self._queues.get(collection.name)
+        if queue is None:
+            queue = self._queues[collection.name] = (collection, deque())
+        queue[1].append(document)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def _pending(self) -> bool:
+        return any(buffer for _, buffer in self._queues.values())
+
+    async def _flush_loop(self):
+        """Flush periodically until every queue is empty"""
+        try:
+            while self._pending():
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            # asyncio.run cancels leftover tasks when it returns but still
+            # lets them finish, so write out what is queued before exiting
+            await self.flush()
+            raise
+
+    async def _flush_queue(self, collection, buffer: deque):
+        """Write one collection's queued documents"""
+        while buffer:
+            batch = [
+                buffer.popleft()
+                for _ in range(min(len(buffer), self.max_batch))
+            ]
+            try:
+                await collection.insert_many(batch, ordered=False)
+            except Exception as e:
+                logger.error(f"Error writing batch to {collection.name}: {str(e)}")
+
+    async def flush(self):
+        """Write everything buffered so far"""
+        await asyncio.gather(*(
+            self._flush_queue(collection, buffer)
+            for collection, buffer in self._queues.values()
+            if buffer
+        ))
+
+    async def aclose(self):
+        """Stop the background flusher and write out what is left"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
@@ -1,15 +1,32 @@
 # utils/data_handlers.py
+import asyncio
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Union
 import logging
 from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import UpdateOne, WriteConcern
+from utils.batch_writer import AsyncBatchWriter
 
 logger = logging.getLogger(__name__)
 
+# Reads are fetched in batches of this size, and analytics reads are capped
+_CURSOR_BATCH_SIZE = 256
+_MAX_ANALYTICS_RESULTS = 1000
+
+def _as_oid(value: Union[str, ObjectId]) -> ObjectId:
+    """Accept an ObjectId as-is; parse it only when given a string"""
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
 class AsyncBlogContentHandler:
     def __init__(self, db):
         self.db = db
         self.collection = db.blog_content
+        # Generated content can be regenerated, so its inserts only wait
+        # for the primary's acknowledgement
+        self._content_writes = self.collection.with_options(
+            write_concern=WriteConcern(w=1, j=False)
+        )
 
     async def save_content(
         self,
@@ -20,20 +37,50 @@ class AsyncBlogContentHandler:
     ) -> Optional[str]:
         """Save blog content"""
         try:
+            now = datetime.utcnow()
             document = {
                 'user_email': user_email,
                 'type': content_type,
                 'content': content,
                 'metadata': metadata,
-                'created_at': datetime.utcnow(),
-                'updated_at': datetime.utcnow()
+                'created_at': now,
+                'updated_at': now
             }
-            result = await self.collection.insert_one(document)
+            result = await self._content_writes.insert_one(document)
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Error saving content: {str(e)}")
             return None
 
+    async def save_research(
+        self,
+        user_email: str,
+        document_refs: List[Dict[str, Any]],
+        analysis: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Save research analysis with references to the source documents.
+
+        Only the GridFS file id and SHA-256 digest of each document are
+        stored; the document bytes already live in GridFS.
+        """
+        try:
+            now = datetime.utcnow()
+            document = {
+                'user_email': user_email,
+                'type': 'research',
+                'document_refs': document_refs,
+                'analysis': analysis,
+                'metadata': metadata or {},
+                'created_at': now,
+                'updated_at': now
+            }
+            result = await self.collection.insert_one(document)
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"Error saving research: {str(e)}")
+            return None
+
     async def get_user_content(
         self,
         user_email: str,
@@ -46,22 +93,22 @@ class AsyncBlogContentHandler:
             if content_type:
                 query['type'] = content_type
             
-            cursor = self.collection.find(query).sort('created_at', -1).limit(limit)
-            return await cursor.to_list(length=None)
+            cursor = self.collection.find(query).sort('created_at', -1).limit(limit).batch_size(_CURSOR_BATCH_SIZE)
+            return await cursor.to_list(length=limit)
         except Exception as e:
             logger.error(f"Error retrieving content: {str(e)}")
             return []
 
     async def update_content(
         self,
-        content_id: str,
+        content_id: Union[str, ObjectId],
         updates: Dict[str, Any]
     ) -> bool:
         """Update content"""
         try:
             updates['updated_at'] = datetime.utcnow()
             result = await self.collection.update_one(
-                {'_id': ObjectId(content_id)},
+                {'_id': _as_oid(content_id)},
                 {'$set': updates}
             )
             return result.modified_count > 0
@@ -69,10 +116,100 @@ class AsyncBlogContentHandler:
             logger.error(f"Error updating content: {str(e)}")
             return False
 
+class AsyncFileHandler:
+    def __init__(self, db):
+        self.db = db
+        self.fs = AsyncIOMotorGridFSBucket(db)
+
+    async def save_file(
+        self,
+        filename: str,
+        file_data: bytes,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """Store a file in GridFS"""
+        try:
+            file_id = await self.fs.upload_from_stream(
+                filename,
+                file_data,
+                metadata=metadata or {}
+            )
+            return str(file_id)
+        except Exception as e:
+            logger.error(f"Error saving file {filename}: {str(e)}")
+            return None
+
+    async def get_file(self, file_id: Union[str, ObjectId]) -> Optional[bytes]:
+        """Read a file's contents from GridFS"""
+        try:
+            stream = await self.fs.open_download_stream(_as_oid(file_id))
+            return await stream.read()
+        except Exception as e:
+            logger.error(f"Error retrieving file {file_id}: {str(e)}")
+            return None
+
+    async def delete_file(self, file_id: Union[str, ObjectId]) -> bool:
+        """Remove a file from GridFS"""
+        try:
+            await self.fs.delete(_as_oid(file_id))
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting file {file_id}: {str(e)}")
+            return False
+
 class AsyncAnalyticsHandler:
     def __init__(self, db):
         self.db = db
         self.collection = db.analytics
+        # Per-user daily activity counts, so grouped analytics never scan
+        # raw events
+        self.rollup_collection = db.analytics_rollup
+        self.writer = AsyncBatchWriter(self.collection)
+        # (user_email, day, activity_type) -> [count, last_activity] not
+        # yet applied to the rollup; one bulk_write per flush applies them
+        self._rollup: Dict[Tuple[str, datetime, str], List[Any]] = {}
+        self._rollup_task = None
+
+    def _count_activity(self, user_email: str, activity_type: str, now: datetime) -> None:
+        """Add one event to the pending rollup increments"""
+        day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        pending = self._rollup.get((user_email, day, activity_type))
+        if pending is None:
+            self._rollup[(user_email, day, activity_type)] = [1, now]
+        else:
+            pending[0] += 1
+            pending[1] = max(pending[1], now)
+        if self._rollup_task is None or self._rollup_task.done():
+            self._rollup_task = asyncio.create_task(self._rollup_loop())
+
+    async def _rollup_loop(self):
+        """Apply rollup increments periodically until none are pending"""
+        try:
+            while self._rollup:
+                await asyncio.sleep(self.writer.flush_interval)
+                await self.flush_rollup()
+        except asyncio.CancelledError:
+            # Same as AsyncBatchWriter: write out what is pending when the
+            # run that owns this task cancels it
+            await self.flush_rollup()
+            raise
+
+    async def flush_rollup(self):
+        """Apply every pending rollup increment in one bulk_write"""
+        if not self._rollup:
+            return
+        pending, self._rollup = self._rollup, {}
+        try:
+            await self.rollup_collection.bulk_write([
+                UpdateOne(
+                    {'user_email': user_email, 'day': day, 'activity_type': activity_type},
+                    {'$inc': {'count': count}, '$max': {'last_activity': last_activity}},
+                    upsert=True
+                )
+                for (user_email, day, activity_type), (count, last_activity) in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error updating analytics rollup: {str(e)}")
 
     async def log_activity(
         self,
@@ -82,32 +219,64 @@ class AsyncAnalyticsHandler:
     ) -> None:
         """Log user activity"""
         try:
-            await self.collection.insert_one({
+            now = datetime.utcnow()
+            self.writer.enqueue({
                 'user_email': user_email,
                 'activity_type': activity_type,
                 'metadata': metadata,
-                'timestamp': datetime.utcnow()
+                'timestamp': now
             })
+            self._count_activity(user_email, activity_type, now)
         except Exception as e:
             logger.error(f"Error logging activity: {str(e)}")
 
+    async def aclose(self):
+        """Write out buffered activity before shutdown"""
+        if self._rollup_task is not None and not self._rollup_task.done():
+            self._rollup_task.cancel()
+        await asyncio.gather(self.writer.aclose(), self.flush_rollup())
+
     async def get_user_analytics(
         self,
         user_email: str,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        limit: int = _MAX_ANALYTICS_RESULTS,
+        group: bool = False
     ) -> List[Dict[str, Any]]:
-        """Get user analytics"""
+        """Get user analytics, or per activity type counts when group is set"""
         try:
+            if group:
+                # Counts come from the daily rollup, so the date range is
+                # applied at day granularity
+                await self.flush_rollup()
+                query = {'user_email': user_email}
+                if start_date and end_date:
+                    query['day'] = {
+                        '$gte': start_date.replace(hour=0, minute=0, second=0, microsecond=0),
+                        '$lte': end_date
+                    }
+                cursor = self.rollup_collection.aggregate([
+                    {'$match': query},
+                    {'$group': {
+                        '_id': '$activity_type',
+                        'count': {'$sum': '$count'},
+                        'last_activity': {'$max': '$last_activity'}
+                    }},
+                    {'$sort': {'count': -1}}
+                ])
+                return await cursor.to_list(length=None)
+
+            await self.writer.flush()
             query = {'user_email': user_email}
             if start_date and end_date:
                 query['timestamp'] = {
                     '$gte': start_date,
                     '$lte': end_date
                 }
-            
-            cursor = self.collection.find(query).sort('timestamp', -1)
-            return await cursor.to_list(length=None)
+
+            cursor = self.collection.find(query).sort('timestamp', -1).limit(limit).batch_size(_CURSOR_BATCH_SIZE)
+            return await cursor.to_list(length=limit)
         except Exception as e:
             logger.error(f"Error retrieving analytics: {str(e)}")
             return []
\ No newline at end of file
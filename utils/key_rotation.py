@@ -1,28 +1,50 @@
 # utils/key_rotation.py
 import secrets
+import time
 import jwt
+from bson import Binary, ObjectId
 from datetime import datetime, timedelta
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
+# The active key is served from memory, but re-read at least this often so
+# a rotation done by another process is picked up
+_ACTIVE_KEY_REFRESH_SECONDS = 60
+
+# A cached key this close to expiry is re-read rather than handed out
+_ACTIVE_KEY_MIN_REMAINING = timedelta(minutes=5)
+
+# Keys are stored as 32 raw bytes but handed out in their hex form, which
+# is what JWT_SECRET_KEY holds in .env and what the token code signs with.
+# A key read from jwt_keys and the same key read from the environment are
+# therefore the same HMAC secret.
+
 class JWTKeyRotator:
     def __init__(self, db):
         self.db = db
         self.keys_collection = db.jwt_keys
+        # (hex key, expires_at, monotonic time it was loaded)
+        self._active_key_cache: Optional[Tuple[str, datetime, float]] = None
 
-    async def generate_new_key(self) -> str:
+    async def generate_new_key(self) -> bytes:
         """Generate a new JWT secret key"""
-        return secrets.token_hex(32)
+        return secrets.token_bytes(32)
 
-    async def store_key(self, key: str, expiry_days: int = 30) -> str:
+    async def store_key(
+        self,
+        key: bytes,
+        expiry_days: int = 30,
+        created_at: Optional[datetime] = None
+    ) -> str:
         """Store a new JWT key with expiration"""
         try:
+            created_at = created_at or datetime.utcnow()
             key_doc = {
-                'key': key,
-                'created_at': datetime.utcnow(),
-                'expires_at': datetime.utcnow() + timedelta(days=expiry_days),
+                'key': Binary(key),
+                'created_at': created_at,
+                'expires_at': created_at + timedelta(days=expiry_days),
                 'is_active': True
             }
             result = await self.keys_collection.insert_one(key_doc)
@@ -36,35 +58,56 @@ class JWTKeyRotator:
         try:
             # Generate new key
             new_key = await self.generate_new_key()
-            
-            # Store new key
-            new_key_id = await self.store_key(new_key, expiry_days)
-            
-            # Deactivate old keys
+            now = datetime.utcnow()
+
+            # Store the new key first so a failed insert never leaves the
+            # collection without an active key, then deactivate the others
+            new_key_id = await self.store_key(new_key, expiry_days, created_at=now)
             await self.keys_collection.update_many(
-                {'_id': {'$ne': new_key_id}},
+                {'_id': {'$ne': ObjectId(new_key_id)}, 'is_active': True},
                 {'$set': {'is_active': False}}
             )
-            
+
+            expires_at = now + timedelta(days=expiry_days)
+            self._active_key_cache = (new_key.hex(), expires_at, time.monotonic())
+
             return {
                 'key_id': new_key_id,
-                'key': new_key,
-                'expires_at': datetime.utcnow() + timedelta(days=expiry_days)
+                'key': new_key.hex(),
+                'expires_at': expires_at
             }
         except Exception as e:
             logger.error(f"Error rotating JWT key: {e}")
             raise
 
     async def get_active_key(self) -> Optional[str]:
-        """Get the current active JWT key"""
+        """Get the current active JWT key, hex encoded"""
         try:
+            now = datetime.utcnow()
+            cached = self._active_key_cache
+            if cached is not None:
+                key, expires_at, loaded_at = cached
+                if (expires_at > now + _ACTIVE_KEY_MIN_REMAINING
+                        and time.monotonic() - loaded_at < _ACTIVE_KEY_REFRESH_SECONDS):
+                    return key
+
             key_doc = await self.keys_collection.find_one(
                 {
                     'is_active': True,
-                    'expires_at': {'$gt': datetime.utcnow()}
-                }
+                    'expires_at': {'$gt': now}
+                },
+                {'_id': 0, 'key': 1, 'expires_at': 1}
             )
-            return key_doc['key'] if key_doc else None
+            if not key_doc:
+                self._active_key_cache = None
+                return None
+
+            key = key_doc['key']
+            # Keys stored before the switch to Binary are already hex strings
+            if not isinstance(key, str):
+                key = bytes(key).hex()
+            self._active_key_cache = (key, key_doc['expires_at'], time.monotonic())
+            return key
         except Exception as e:
             logger.error(f"Error retrieving active JWT key: {e}")
             return None
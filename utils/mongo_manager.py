@@ -3,53 +3,101 @@ import os
 import motor.motor_asyncio
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import IndexModel
 import logging
-from typing import Tuple, Any
+from typing import Optional, Tuple, Any
+from dotenv import load_dotenv
+from config import get_settings
+
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-def ensure_event_loop():
-    """Ensure an event loop exists in the current thread"""
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    return loop
+_MONGODB_URI = os.getenv('MONGODB_URI')
+
+# createIndex is a no-op when the same index already exists, so indexes are
+# only dropped and rebuilt when their names or options change. Bump this
+# when editing an index spec below.
+_INDEX_SCHEMA_VERSION = 1
 
 class AsyncMongoManager:
+    _instance: Optional['AsyncMongoManager'] = None
+    # Created inside the running loop; before Python 3.10 a lock binds to
+    # the loop current when it is constructed
+    _instance_lock: Optional[asyncio.Lock] = None
+    _instance_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
     def __init__(self):
-        self.uri = os.getenv('MONGODB_URI')
+        self.uri = _MONGODB_URI
         if not self.uri:
             raise ValueError("MONGODB_URI not found in environment variables")
 
-        # Ensure event loop exists
-        ensure_event_loop()
-        
-        # Initialize client
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(self.uri)
+        # Initialize client; compress wire traffic when the server supports it
+        self.client = motor.motor_asyncio.AsyncIOMotorClient(
+            self.uri,
+            maxPoolSize=get_settings().MAX_CONNECTIONS,
+            minPoolSize=get_settings().MIN_CONNECTIONS,
+            waitQueueTimeoutMS=2000,
+            serverSelectionTimeoutMS=5000,
+            compressors='zstd,zlib',
+            zlibCompressionLevel=3
+        )
         self.db = self.client.fairness_factor_blog
+        self._loop = asyncio.get_running_loop()
+        # The bucket only wraps collection handles, so it is built up front
+        self.fs = AsyncIOMotorGridFSBucket(self.db)
+
+    @classmethod
+    async def instance(cls) -> 'AsyncMongoManager':
+        """Shared manager for the running loop, connected on first use.
+
+        Motor binds a client to the loop that first uses it, and Streamlit
+        runs every rerun under a fresh asyncio.run, so a manager left over
+        from an earlier loop is closed and replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if cls._instance is None or cls._instance._loop is not loop:
+            if cls._instance_lock is None or cls._instance_lock_loop is not loop:
+                cls._instance_lock = asyncio.Lock()
+                cls._instance_lock_loop = loop
+            async with cls._instance_lock:
+                stale = cls._instance
+                if stale is None or stale._loop is not loop:
+                    manager = cls()
+                    await manager.initialize()
+                    cls._instance = manager
+                    if stale is not None:
+                        await stale.close()
+        return cls._instance
+
+    async def get_connection(self) -> Tuple[Any, Any]:
+        """Get the client and database"""
+        return self.client, self.db
 
     async def get_fs(self):
-        """Get GridFS bucket lazily"""
-        if not hasattr(self, 'fs'):
-            self.fs = AsyncIOMotorGridFSBucket(self.db)
+        """Get GridFS bucket"""
         return self.fs
 
-    async def _ensure_index(self, collection, keys, **kwargs):
-        """Safely create an index if it doesn't exist"""
-        try:
-            # Drop any existing index with the same key pattern
-            await collection.drop_index([(k, v) for k, v in keys])
-        except:
-            # Ignore errors from dropping non-existent indexes
-            pass
+    async def _index_schema_outdated(self) -> bool:
+        """Whether the stored index schema predates _INDEX_SCHEMA_VERSION"""
+        meta = await self.db.meta.find_one({'_id': 'index_schema'}, {'version': 1})
+        return not meta or meta.get('version', 0) < _INDEX_SCHEMA_VERSION
+
+    async def _ensure_indexes(self, collection, models, rebuild: bool = False):
+        """Safely create a collection's indexes in one command"""
+        if rebuild:
+            for model in models:
+                try:
+                    # Drop an index with the same key pattern but an older spec
+                    await collection.drop_index(list(model.document['key'].items()))
+                except Exception:
+                    # Ignore errors from dropping non-existent indexes
+                    pass
 
         try:
-            # Create new index
-            await collection.create_index([(k, v) for k, v in keys], **kwargs)
+            await collection.create_indexes(models)
         except Exception as e:
-            logger.warning(f"Error creating index on {collection.name}: {str(e)}")
+            logger.warning(f"Error creating indexes on {collection.name}: {str(e)}")
 
     async def initialize(self):
         """Initialize database connection and indexes"""
@@ -58,16 +106,36 @@ class AsyncMongoManager:
             await self.client.admin.command('ping')
             
             # Create indexes safely
-            await self._ensure_index(self.db.users, [('email', 1)], unique=True, name='unique_email')
-            await self._ensure_index(self.db.blog_content, [('user_email', 1)], name='blog_user_email')
-            await self._ensure_index(self.db.blog_content, [('created_at', -1)], name='blog_created_at')
-            await self._ensure_index(self.db.analytics, [('timestamp', -1)], name='analytics_timestamp')
+            rebuild = await self._index_schema_outdated()
+            # Collections are independent, so build their indexes concurrently
+            await asyncio.gather(
+                self._ensure_indexes(self.db.users, [
+                    IndexModel([('email', 1)], unique=True, name='unique_email')
+                ], rebuild),
+                self._ensure_indexes(self.db.blog_content, [
+                    IndexModel([('user_email', 1)], name='blog_user_email'),
+                    IndexModel([('created_at', -1)], name='blog_created_at')
+                ], rebuild),
+                self._ensure_indexes(self.db.analytics, [
+                    IndexModel([('timestamp', -1)], name='analytics_timestamp')
+                ], rebuild),
+                self._ensure_indexes(self.db.analytics_rollup, [
+                    IndexModel(
+                        [('user_email', 1), ('day', 1), ('activity_type', 1)],
+                        unique=True,
+                        name='analytics_rollup_user_day_type'
+                    )
+                ], rebuild)
+            )
+            if rebuild:
+                await self.db.meta.update_one(
+                    {'_id': 'index_schema'},
+                    {'$set': {'version': _INDEX_SCHEMA_VERSION}},
+                    upsert=True
+                )
 
-            # Initialize GridFS
-            fs = await self.get_fs()
-            
             logger.info("Successfully connected to MongoDB and initialized indexes")
-            return self.client, self.db, fs
+            return self.client, self.db, self.fs
             
         except Exception as e:
             logger.error(f"Failed to initialize MongoDB: {e}")
@@ -79,19 +147,22 @@ class AsyncMongoManager:
         if hasattr(self, 'client'):
             self.client.close()
 
+async def get_db_session() -> Tuple[Any, Any, Any]:
+    """Get the shared client, database and GridFS bucket.
+
+    The client is a connection pool shared by everything on the running
+    loop, so there is nothing to open or close per request. Work that
+    needs a transaction or causal consistency should scope a real session
+    with `async with client.start_session() as s:`.
+    """
+    manager = await AsyncMongoManager.instance()
+    return manager.client, manager.db, manager.fs
+
 class AsyncDatabaseSession:
-    def __init__(self):
-        self.manager = None
+    """Deprecated; await get_db_session() instead"""
 
     async def __aenter__(self) -> Tuple[Any, Any, Any]:
-        # Create manager and initialize connection
-        self.manager = AsyncMongoManager()
-        return await self.manager.initialize()
+        return await get_db_session()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.manager:
-            await self.manager.close()
-
-def get_db_session() -> AsyncDatabaseSession:
-    """Get database session"""
-    return AsyncDatabaseSession()
\ No newline at end of file
+        pass
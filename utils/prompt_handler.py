@@ -1,44 +1,85 @@
 # utils/prompt_handler.py
 import os
-from typing import Optional, Dict, Any
+import re
+import string
+import time
+from typing import Optional, Dict, Any, Tuple
 import logging
 import json
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Templates change rarely; serve them from memory for this long
+_TEMPLATE_CACHE_TTL_SECONDS = 300
+
+class _SafeDict(dict):
+    """Leaves placeholders that have no value in place"""
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+def _supports_format_map(template: str) -> bool:
+    """Whether every brace in the template is a plain {name} placeholder"""
+    if '{{' in template or '}}' in template:
+        return False
+    try:
+        for _, field, spec, conversion in string.Formatter().parse(template):
+            if field is not None and (not field.isidentifier() or spec or conversion):
+                return False
+    except ValueError:
+        return False
+    return True
+
 class AsyncPromptHandler:
     def __init__(self, db):
         self.db = db
         self.prompts_collection = db.prompts
+        # prompt name -> (monotonic time loaded, template, format_map safe)
+        self._template_cache: Dict[str, Tuple[float, str, bool]] = {}
+
+    async def _get_template(self, prompt_name: str) -> Tuple[float, str, bool]:
+        """Cached template entry, reloaded once it is older than the TTL"""
+        cached = self._template_cache.get(prompt_name)
+        if cached is None or time.monotonic() - cached[0] >= _TEMPLATE_CACHE_TTL_SECONDS:
+            content = await self._fetch_prompt(prompt_name)
+            cached = (time.monotonic(), content, _supports_format_map(content))
+            self._template_cache[prompt_name] = cached
+        return cached
 
     async def load_prompt(self, prompt_name: str) -> Optional[str]:
         """Load prompt template from database or file system"""
         try:
-            # Try to load from database first
-            prompt_doc = await self.prompts_collection.find_one({'name': prompt_name})
-            if prompt_doc:
-                return prompt_doc['content']
-
-            # Fall back to file system
-            prompt_path = f"prompts/{prompt_name}.txt"
-            if os.path.exists(prompt_path):
-                with open(prompt_path, 'r') as f:
-                    content = f.read()
-                    # Store in database for future use
-                    await self.prompts_collection.insert_one({
-                        'name': prompt_name,
-                        'content': content,
-                        'created_at': datetime.now()
-                    })
-                    return content
-            
-            raise FileNotFoundError(f"Prompt template {prompt_name} not found")
-            
+            return (await self._get_template(prompt_name))[1]
         except Exception as e:
             logger.error(f"Error loading prompt {prompt_name}: {str(e)}")
             return None
 
+    async def _fetch_prompt(self, prompt_name: str) -> str:
+        """Read a prompt template from the database, seeding it from disk"""
+        # Try to load from database first
+        prompt_doc = await self.prompts_collection.find_one(
+            {'name': prompt_name},
+            {'_id': 0, 'content': 1}
+        )
+        if prompt_doc:
+            return prompt_doc['content']
+
+        # Fall back to file system
+        prompt_path = f"prompts/{prompt_name}.txt"
+        if os.path.exists(prompt_path):
+            with open(prompt_path, 'r') as f:
+                content = f.read()
+            # Store in database for future use
+            await self.prompts_collection.insert_one({
+                'name': prompt_name,
+                'content': content,
+                'created_at': datetime.utcnow()
+            })
+            return content
+
+        raise FileNotFoundError(f"Prompt template {prompt_name} not found")
+
     async def format_prompt(
         self, 
         prompt_name: str, 
@@ -46,16 +87,26 @@ class AsyncPromptHandler:
     ) -> Optional[str]:
         """Load and format prompt template with variables"""
         try:
-            template = await self.load_prompt(prompt_name)
+            _, template, fast = await self._get_template(prompt_name)
             if not template:
                 return None
 
-            # Format prompt with variables
-            formatted_prompt = template
-            for key, value in variables.items():
-                formatted_prompt = formatted_prompt.replace(f"{{{key}}}", str(value))
+            # One pass over the template when its braces are all simple
+            # placeholders; otherwise match every known placeholder at once
+            if fast:
+                return template.format_map(_SafeDict(variables))
+            if not variables:
+                return template
 
-            return formatted_prompt
+            # A single pass also keeps a value containing {other_key} from
+            # being substituted again
+            pattern = re.compile('|'.join(
+                re.escape(f"{{{key}}}") for key in variables
+            ))
+            return pattern.sub(
+                lambda match: str(variables[match.group(0)[1:-1]]),
+                template
+            )
 
         except Exception as e:
             logger.error(f"Error formatting prompt {prompt_name}: {str(e)}")
@@ -70,13 +121,14 @@ class AsyncPromptHandler:
     ) -> Optional[str]:
         """Save prompt usage history"""
         try:
-            result = await self.db.prompt_history.insert_one({
+            document = {
                 'prompt_name': prompt_name,
                 'variables': variables,
                 'formatted_prompt': formatted_prompt,
                 'user_email': user_email,
-                'timestamp': datetime.now()
-            })
+                'timestamp': datetime.utcnow()
+            }
+            result = await self.db.prompt_history.insert_one(document)
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Error saving prompt history: {str(e)}")
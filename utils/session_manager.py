@@ -1,13 +1,24 @@
 # utils/session_manager.py
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Union
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import UpdateOne
 
 logger = logging.getLogger(__name__)
 
+# Active-session reads fetch this many documents per round trip
+_SESSION_BATCH_SIZE = 50
+
+# Session writes let the server stamp last_accessed with its own clock
+_TOUCH = {'last_accessed': True}
+
+def _as_oid(session_id: Union[str, ObjectId]) -> ObjectId:
+    """Parse a session id unless the caller already holds an ObjectId"""
+    return session_id if isinstance(session_id, ObjectId) else ObjectId(session_id)
+
 class AsyncSessionManager:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
@@ -17,71 +28,114 @@ class AsyncSessionManager:
         self, 
         user_email: str, 
         session_data: Dict[str, Any]
-    ) -> Optional[str]:
+    ) -> Optional[ObjectId]:
+        """Create a session and return its id"""
         try:
-            result = await self.sessions_collection.insert_one({
+            now = datetime.utcnow()
+            session = {
+                '_id': ObjectId(),
                 'user_email': user_email,
                 'data': session_data,
-                'created_at': datetime.now(),
-                'last_accessed': datetime.now(),
+                'created_at': now,
+                'last_accessed': now,
                 'active': True
-            })
-            return str(result.inserted_id)
+            }
+            await self.sessions_collection.insert_one(session)
+            return session['_id']
         except Exception as e:
             logger.error(f"Error creating session: {str(e)}")
             return None
 
+    async def get_session(self, session_id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
+        """Get a session"""
+        try:
+            return await self.sessions_collection.find_one({'_id': _as_oid(session_id)})
+        except Exception as e:
+            logger.error(f"Error retrieving session: {str(e)}")
+            return None
+
     async def update_session(
         self, 
-        session_id: str, 
+        session_id: Union[str, ObjectId], 
         session_data: Dict[str, Any]
     ) -> bool:
         try:
+            # Sessions ended elsewhere or expired by the TTL index are not
+            # revived
             result = await self.sessions_collection.update_one(
-                {'_id': ObjectId(session_id)},
-                {
-                    '$set': {
-                        'data': session_data,
-                        'last_accessed': datetime.now()
-                    }
-                }
+                {'_id': _as_oid(session_id), 'active': True},
+                {'$set': {'data': session_data}, '$currentDate': _TOUCH}
             )
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error updating session: {str(e)}")
             return False
 
-    async def end_session(self, session_id: str) -> bool:
+    async def update_sessions_bulk(
+        self,
+        updates: Dict[Union[str, ObjectId], Dict[str, Any]]
+    ) -> int:
+        """Update the data of several sessions in one round trip"""
+        try:
+            if not updates:
+                return 0
+            requests = [
+                UpdateOne(
+                    {'_id': _as_oid(session_id), 'active': True},
+                    {'$set': {'data': session_data}, '$currentDate': _TOUCH}
+                )
+                for session_id, session_data in updates.items()
+            ]
+            result = await self.sessions_collection.bulk_write(requests, ordered=False)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error updating sessions: {str(e)}")
+            return 0
+
+    async def end_session(self, session_id: Union[str, ObjectId]) -> bool:
         try:
             result = await self.sessions_collection.update_one(
-                {'_id': ObjectId(session_id)},
-                {
-                    '$set': {
-                        'active': False,
-                        'ended_at': datetime.now()
-                    }
-                }
+                {'_id': _as_oid(session_id)},
+                {'$set': {'active': False}, '$currentDate': {'ended_at': True}}
             )
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error ending session: {str(e)}")
             return False
 
-    async def get_active_sessions(self, user_email: str) -> List[Dict[str, Any]]:
+    def _active_sessions_cursor(self, user_email: str, include_data: bool):
+        """Cursor over a user's active sessions, most recently used first"""
+        return self.sessions_collection.find(
+            {'user_email': user_email, 'active': True},
+            None if include_data else {'data': 0}
+        ).sort('last_accessed', -1).batch_size(_SESSION_BATCH_SIZE)
+
+    async def get_active_sessions(
+        self,
+        user_email: str,
+        include_data: bool = True
+    ) -> List[Dict[str, Any]]:
         try:
-            cursor = self.sessions_collection.find({
-                'user_email': user_email,
-                'active': True
-            }).sort('last_accessed', -1)
+            cursor = self._active_sessions_cursor(user_email, include_data)
             return await cursor.to_list(length=None)
         except Exception as e:
             logger.error(f"Error retrieving active sessions: {str(e)}")
             return []
 
+    async def iter_active_sessions(
+        self,
+        user_email: str,
+        include_data: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a user's active sessions one batch at a time"""
+        async for session in self._active_sessions_cursor(user_email, include_data):
+            yield session
+
     async def cleanup_expired_sessions(self, expiry_hours: int = 24) -> int:
-        """Clean up expired sessions"""
+        """End sessions idle for expiry_hours; the TTL index deletes them later"""
         try:
-            expiry_time = datetime.now() - timedelta(hours=expiry_hours)
+            now = datetime.utcnow()
+            expiry_time = now - timedelta(hours=expiry_hours)
             result = await self.sessions_collection.update_many(
                 {
                     'active': True,
@@ -90,7 +144,7 @@ class AsyncSessionManager:
                 {
                     '$set': {
                         'active': False,
-                        'ended_at': datetime.now()
+                        'ended_at': now
                     }
                 }
             )